@@ -33,16 +33,117 @@ PATH_LOCAL_STORAGE_CHUNKED_DATA_JOBLIB_FILE = os.path.join(
 PATH_LOCAL_STORAGE_VECTOR_STORE = os.path.join(
     BASE_DIRECTORY, "pi_agent_core", "index_generation", "storage", "vector_store"
 )
+# Index loaded when no build was recorded in PATH_INDEX_VERSION_FILE
 INDEX_PATH = os.path.join(
     BASE_DIRECTORY, "pi_agent_core", "index_generation", "storage", "vector_store"
 )
+# Version of the last complete index build, API workers reload when it changes
+PATH_INDEX_VERSION_FILE = os.path.join(PATH_LOCAL_STORAGE, "index_version.json")
+# Each build is persisted in its own folder, named after its version
+PATH_LOCAL_STORAGE_INDEX_BUILDS = os.path.join(PATH_LOCAL_STORAGE, "index_builds")
+# Held while an index is built, a second build is refused until it is released
+PATH_INDEX_BUILD_LOCK_FILE = os.path.join(PATH_LOCAL_STORAGE, "index_build.lock")
+# Single-file index snapshot, built offline and opened by the "snapshot" backend
+INDEX_SNAPSHOT_PATH = os.getenv(
+    "INDEX_SNAPSHOT_PATH",
+    os.path.join(BASE_DIRECTORY, "index_snapshot", "index.snapshot"),
+)
+# Check the sha256 of the whole snapshot on load, instead of only its manifest
+INDEX_SNAPSHOT_VERIFY_ON_LOAD = False
+# Dimension of the indexed embeddings, None keeps the model dimension. Models
+# supporting it (OpenAI text-embedding-3) return it natively, the others are
+# reduced with a PCA projection fit at index build time and saved with the index
+EMBEDDING_DIMENSIONS = (
+    int(os.environ["EMBEDDING_DIMENSIONS"])
+    if os.getenv("EMBEDDING_DIMENSIONS")
+    else None
+)
+# Max number of chunk embeddings the PCA projection is fit on
+EMBEDDING_PCA_MAX_SAMPLES = 20000
+# Number of nodes embedded and inserted into the vector store at a time
+INDEX_INSERT_BATCH_SIZE = 10000
 
 # Agent config
 PI_AGENT_CONFIG = os.path.join(BASE_DIRECTORY, "config", "pi_agent_config.yml")
 
+# Admission control config for /predict
+# Requests processed at the same time, the rest wait in a bounded queue
+ADMISSION_MAX_IN_FLIGHT = 16
+ADMISSION_MAX_QUEUE_SIZE = 64
+# Max seconds a request may wait before starting, clients can ask for less
+# through the X-Request-Timeout header
+ADMISSION_QUEUE_TIMEOUT_SECONDS = 10.0
+# Priority classes selected through the X-Priority header, lower is served first
+ADMISSION_PRIORITY_CLASSES = {"high": 0, "normal": 1, "low": 2}
+ADMISSION_DEFAULT_PRIORITY = "normal"
+
+# Shared cache config, a SQLite file shared by every API worker of the node
+PATH_SHARED_CACHE_SQLITE_FILE = os.path.join(
+    BASE_DIRECTORY, "shared_cache", "cache.sqlite3"
+)
+# Cache of the /predict responses to stateless requests, cleared on index creation
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TTL_SECONDS = 3600
+RESPONSE_CACHE_MAX_ENTRIES = 10000
+# Cache of the query and document embeddings
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_MAX_ENTRIES = 100000
+
+# Request profiling config
+# Token of the X-Admin-Token header, required to ask for a profile through the
+# X-Profile header and to read the captures. Profiling on demand is off when unset
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN")
+# Fraction of the requests profiled without being asked, 0 disables sampling
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+# Seconds between two stack samples of a profiled request
+PROFILING_INTERVAL_SECONDS = 0.005
+PROFILING_MAX_CAPTURES = 200
+PROFILING_DIR = os.path.join(BASE_DIRECTORY, "profiles")
+
+# Multi-worker serving config
+# Number of API worker processes forked by pi_agent_core.server
+SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Conversation store config
+# Backend keeping the chat sessions: "memory" or "sqlite". Sessions in memory
+# are not shared by the workers, so "sqlite" is the default with several of them
+CONVERSATION_STORE = os.getenv(
+    "CONVERSATION_STORE", "sqlite" if SERVER_WORKERS > 1 else "memory"
+)
+CONVERSATION_STORE_TTL_SECONDS = 3600
+# Total size of the serialized sessions kept by the "memory" backend
+CONVERSATION_STORE_MAX_BYTES = 64 * 1024 * 1024
+PATH_CONVERSATION_STORE_SQLITE_FILE = os.path.join(
+    BASE_DIRECTORY, "conversation_store", "conversations.sqlite3"
+)
+# Attempts to save a turn when concurrent requests of the session saved first
+CONVERSATION_SAVE_ATTEMPTS = 5
+
 # Vector Store config
-VECTOR_STORE = "chroma"
+# Backend of the index: "chroma", "faiss", "numpy", "simple" or "snapshot"
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
 CHROMA_PERSISTENT_CLIENT_PATH = os.path.join(
     BASE_DIRECTORY, "pi_agent_core", "index_generation", "storage", "chroma_collection"
 )
 CHROMA_COLLECTION_NAME = "pi_collection"
+# Connect to a Chroma server instead of the on-disk store when the host is set
+CHROMA_SERVER_HOST = os.getenv("CHROMA_SERVER_HOST")
+CHROMA_SERVER_PORT = int(os.getenv("CHROMA_SERVER_PORT", "8001"))
+# HNSW parameters, only applied when the collection is created
+CHROMA_HNSW_SPACE = "cosine"
+CHROMA_HNSW_M = 16
+CHROMA_HNSW_CONSTRUCTION_EF = 100
+CHROMA_HNSW_SEARCH_EF = 50
+# Vectors buffered in brute force before being added to the HNSW graph
+CHROMA_HNSW_BATCH_SIZE = 1000
+# Vectors added before the HNSW graph is flushed to disk
+CHROMA_HNSW_SYNC_THRESHOLD = 10000
+# Max number of nodes per upsert, capped to the client max batch size
+CHROMA_UPSERT_BATCH_SIZE = 10000
+
+# Numpy vector store config
+# Storage type of the search matrix: "float32", "float16" or "int8"
+NUMPY_VECTOR_STORE_DTYPE = "int8"
+# Re-score the quantized candidates against the exact float32 vectors
+NUMPY_VECTOR_STORE_RESCORE = True
+NUMPY_VECTOR_STORE_RESCORE_FACTOR = 4
@@ -1,11 +1,13 @@
 import logging
 from typing import AsyncGenerator
 
+from anyio import to_thread
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
 from pi_agent_core.routers import agent
 from pi_agent_core.infraestructure.ai_service import set_service_context
+from config.config import ADMISSION_MAX_IN_FLIGHT
 
 
 @asynccontextmanager
@@ -15,6 +17,11 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     logging.getLogger("openai").setLevel(logging.DEBUG)
     # Set llama-index setting upper-level configuration
     set_service_context()
+    # Make sure every admitted /predict request gets a worker thread
+    thread_limiter = to_thread.current_default_thread_limiter()
+    thread_limiter.total_tokens = max(
+        thread_limiter.total_tokens, ADMISSION_MAX_IN_FLIGHT
+    )
 
     yield
 
@@ -1,4 +1,20 @@
+import time
+from typing import Optional
+
 from llama_index.core.query_engine import BaseQueryEngine
+from llama_index.core.utils import get_tokenizer
+
+from config.config import PI_AGENT_CONFIG, CONVERSATION_SAVE_ATTEMPTS
+from pi_agent_core.helpers.utils import (
+    load_config_file,
+    condense_question,
+    summarize_conversation,
+)
+from pi_agent_core.infraestructure.conversation_store import (
+    BaseConversationStore,
+    ConversationConflictError,
+)
+from pi_agent_core.models import ConversationMemory, ConversationTurn
 
 
 class ChatService:
@@ -6,26 +22,125 @@ class ChatService:
     A service class to handle chat interactions using a query engine.
 
     This class wraps around a BaseQueryEngine to facilitate querying and
-    retrieving responses based on user input.
+    retrieving responses based on user input. When a session id and a
+    conversation store are provided, follow-up questions are condensed into
+    standalone queries using the session memory, and older turns are summarized
+    so the memory stays under a fixed token budget.
     """
 
     def __init__(
         self,
         engine: BaseQueryEngine,
+        conversation_store: Optional[BaseConversationStore] = None,
     ):
         self.engine = engine
+        self.conversation_store = conversation_store
+        # Time spent loading, condensing, summarizing and saving the session memory
+        self.memory_elapsed_time = 0.0
+
+        chat_memory_params = load_config_file(PI_AGENT_CONFIG)["chat_memory"]
+        self.token_budget = chat_memory_params["token_budget"]
+        self.summary_token_budget = chat_memory_params["summary_token_budget"]
+        self._tokenizer = get_tokenizer()
 
-    def chat(self, user_input: str) -> str:
+    def chat(self, user_input: str, session_id: Optional[str] = None) -> str:
         """Processes user input through the query engine and returns the response.
 
         Args:
             user_input (str): The input string from the user.
+            session_id (Optional[str]): The conversation the input belongs to.
+                                        If None, the input is answered statelessly.
 
         Returns:
             str: The response generated by the query engine.
         """
+        if session_id is None or self.conversation_store is None:
+            # Pass the user input to the query engine and retrieve the response
+            return self.engine.query(str_or_query_bundle=user_input).response
+
+        start_time = time.perf_counter()
+        memory = self.conversation_store.get(session_id) or ConversationMemory()
+
+        # Rewrite follow-ups so retrieval does not depend on the chat history
+        query = user_input
+        if memory.summary or memory.turns:
+            query = condense_question(
+                history=self._format_history(memory), query=user_input
+            ).standalone_question
+        self.memory_elapsed_time = time.perf_counter() - start_time
 
-        # Pass the user input to the query engine and retrieve the response
-        response = self.engine.query(str_or_query_bundle=user_input).response
+        response = self.engine.query(str_or_query_bundle=query).response
+
+        start_time = time.perf_counter()
+        turn = ConversationTurn(user=user_input, assistant=response)
+        for _ in range(CONVERSATION_SAVE_ATTEMPTS):
+            memory.turns.append(turn)
+            self._compress(memory)
+            if self.conversation_store.save(session_id, memory):
+                break
+            # Another request of the session saved first, add the turn to its memory
+            memory = self.conversation_store.get(session_id) or ConversationMemory()
+        else:
+            raise ConversationConflictError(
+                f"Session {session_id} was updated concurrently "
+                f"{CONVERSATION_SAVE_ATTEMPTS} times, the turn was not saved"
+            )
+        self.memory_elapsed_time += time.perf_counter() - start_time
 
         return response
+
+    def _count_tokens(self, text: str) -> int:
+        return len(self._tokenizer(text))
+
+    @staticmethod
+    def _format_turns(turns: list[ConversationTurn]) -> str:
+        return "\n".join(
+            f"User: {turn.user}\nAssistant: {turn.assistant}" for turn in turns
+        )
+
+    def _format_history(self, memory: ConversationMemory) -> str:
+        history = self._format_turns(memory.turns)
+        if memory.summary:
+            history = f"Summary: {memory.summary}\n{history}"
+        return history
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        """Cuts text to at most max_tokens, on word boundaries."""
+        words = text.split()
+        n_tokens = self._count_tokens(text)
+        while words and n_tokens > max_tokens:
+            words = words[: int(len(words) * max_tokens / n_tokens)]
+            n_tokens = self._count_tokens(" ".join(words))
+        return " ".join(words)
+
+    def _compress(self, memory: ConversationMemory) -> None:
+        """Keeps the session memory under the token budget.
+
+        When the budget is exceeded, the oldest turns are folded into the
+        summary until the recent turns use at most half of the tokens left
+        for them. The slack avoids summarizing again on every following turn.
+
+        Args:
+            memory (ConversationMemory): The session memory, updated in place.
+        """
+        if self._count_tokens(self._format_history(memory)) <= self.token_budget:
+            return
+
+        turns_token_budget = (self.token_budget - self.summary_token_budget) // 2
+        folded_turns = []
+        while (
+            memory.turns
+            and self._count_tokens(self._format_turns(memory.turns))
+            > turns_token_budget
+        ):
+            folded_turns.append(memory.turns.pop(0))
+
+        if folded_turns:
+            memory.summary = summarize_conversation(
+                summary=memory.summary,
+                turns=self._format_turns(folded_turns),
+                # Roughly 3 words every 4 tokens
+                max_words=self.summary_token_budget * 3 // 4,
+            ).summary
+
+        memory.summary = self._truncate(memory.summary, self.summary_token_budget)
@@ -1,9 +1,24 @@
+import logging
+import threading
+from typing import Optional
+
 from llama_index.core.query_engine import BaseQueryEngine
+from llama_index.core.vector_stores.types import MetadataFilters
 from llama_index.core import Settings, PromptTemplate
 
 from pi_agent_core.helpers.utils import load_config_file
-from config.config import PI_AGENT_CONFIG, INDEX_PATH, VECTOR_STORE
+from config.config import (
+    PI_AGENT_CONFIG,
+    INDEX_PATH,
+    INDEX_SNAPSHOT_PATH,
+    VECTOR_STORE,
+    CHROMA_COLLECTION_NAME,
+)
 from pi_agent_core.infraestructure.index_managment import IndexManagment
+from pi_agent_core.infraestructure.index_version import (
+    read_index_version,
+    read_index_version_info,
+)
 
 
 class CreateQueryEngineUseCase:
@@ -14,14 +29,57 @@ class CreateQueryEngineUseCase:
     """
 
     _instance = None
+    # Serializes the loads of the index by the request threads
+    _lock = threading.Lock()
+    # Index build whose load failed, not retried on every request
+    _failed_index_version: Optional[str] = None
+
+    @staticmethod
+    def _is_current(instance: Optional["CreateQueryEngineUseCase"]) -> bool:
+        """Whether an instance serves the last recorded index build."""
+        if instance is None:
+            return False
+        index_version = read_index_version()
+        return index_version in (
+            None,
+            instance.index_version,
+            CreateQueryEngineUseCase._failed_index_version,
+        )
 
     @staticmethod
     def get_instance():
         """
         Static method to provide a singleton instance of CreateQueryEngineUseCase.
+
+        The index is reloaded when a newer index build was recorded, e.g. by a
+        /create_index call served by another worker. If the reload fails, the
+        loaded index keeps being served.
         """
-        if CreateQueryEngineUseCase._instance is None:
-            CreateQueryEngineUseCase._instance = CreateQueryEngineUseCase()
+        if CreateQueryEngineUseCase._is_current(CreateQueryEngineUseCase._instance):
+            return CreateQueryEngineUseCase._instance
+
+        with CreateQueryEngineUseCase._lock:
+            previous = CreateQueryEngineUseCase._instance
+            # Another thread may have loaded it while this one waited
+            if CreateQueryEngineUseCase._is_current(previous):
+                return previous
+
+            CreateQueryEngineUseCase._instance = None
+            try:
+                CreateQueryEngineUseCase._instance = CreateQueryEngineUseCase()
+            except Exception as e:
+                if previous is None:
+                    raise
+                CreateQueryEngineUseCase._failed_index_version = read_index_version()
+                logging.error(f"Index reload failed, keeping the loaded one: {str(e)}")
+                CreateQueryEngineUseCase._instance = previous
+            else:
+                if previous is not None:
+                    logging.info(
+                        f"Index reloaded: {previous.index_version} -> "
+                        f"{CreateQueryEngineUseCase._instance.index_version}"
+                    )
+
         return CreateQueryEngineUseCase._instance
 
     def __init__(
@@ -32,17 +90,35 @@ class CreateQueryEngineUseCase:
             raise Exception("This class is a singleton! Use 'get_instance()' method.")
 
         self.agent_params = load_config_file(PI_AGENT_CONFIG)
+        # Read before loading, so a build completed meanwhile triggers a reload.
+        # Each build has its own folder, which later builds never overwrite
+        index_version_info = read_index_version_info() or {}
         index_managment = IndexManagment()
         self.index = index_managment.load_index(
-            index_path=INDEX_PATH, vector_store=VECTOR_STORE
+            index_path=INDEX_SNAPSHOT_PATH
+            if VECTOR_STORE == "snapshot"
+            else index_version_info.get("index_path", INDEX_PATH),
+            vector_store=VECTOR_STORE,
+            chroma_collection_name=index_version_info.get(
+                "chroma_collection", CHROMA_COLLECTION_NAME
+            ),
+        )
+        self.embed_model = index_managment.embed_model
+        # Identifies the loaded index, in the response cache keys among others
+        self.index_version = (
+            index_version_info.get("version") or index_managment.snapshot_version
         )
 
-    def execute(self) -> BaseQueryEngine:
+    def execute(self, filters: Optional[MetadataFilters] = None) -> BaseQueryEngine:
         """Configures and returns a query engine instance.
 
         The query engine is built using the loaded index and additional configuration
         parameters like similarity threshold, QA templates, and temperature.
 
+        Args:
+            filters (Optional[MetadataFilters]): Metadata filters restricting the
+                                                 searched chunks. Defaults to None.
+
         Returns:
             BaseQueryEngine: A configured query engine ready for processing queries.
         """
@@ -54,4 +130,5 @@ class CreateQueryEngineUseCase:
                 self.agent_params["query_engine"]["qa_template"]
             ),
             temperature=self.agent_params["query_engine"]["temperature"],
+            filters=filters,
         )
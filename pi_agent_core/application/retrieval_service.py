@@ -0,0 +1,59 @@
+import time
+from typing import List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.indices.base import BaseIndex
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores.types import MetadataFilters
+
+
+class RetrievalService:
+    """
+    A service class to retrieve the nodes closest to a query without calling the LLM.
+
+    The query embedding and the vector search are timed separately, so retrieval
+    can be measured and tuned independently of the answer synthesis.
+    """
+
+    def __init__(
+        self, index: BaseIndex, embed_model: BaseEmbedding, similarity_top_k: int
+    ):
+        self.index = index
+        self.embed_model = embed_model
+        self.similarity_top_k = similarity_top_k
+        self.embedding_time = 0.0
+        self.retrieval_time = 0.0
+
+    def retrieve(
+        self,
+        query: str,
+        similarity_top_k: Optional[int] = None,
+        filters: Optional[MetadataFilters] = None,
+    ) -> List[NodeWithScore]:
+        """Embeds the query and returns the top k nodes of the index with their scores.
+
+        Args:
+            query (str): The input string from the user.
+            similarity_top_k (Optional[int]): Number of nodes to return.
+                                              Defaults to the query engine setting.
+            filters (Optional[MetadataFilters]): Metadata filters applied before the vector search.
+
+        Returns:
+            List[NodeWithScore]: The retrieved nodes, sorted by decreasing score.
+        """
+        start_time = time.perf_counter()
+        query_embedding = self.embed_model.get_query_embedding(query)
+        self.embedding_time = time.perf_counter() - start_time
+
+        retriever = self.index.as_retriever(
+            similarity_top_k=similarity_top_k or self.similarity_top_k,
+            filters=filters,
+        )
+        start_time = time.perf_counter()
+        # The retriever skips embedding when the bundle already has one
+        nodes = retriever.retrieve(
+            QueryBundle(query_str=query, embedding=query_embedding)
+        )
+        self.retrieval_time = time.perf_counter() - start_time
+
+        return nodes
@@ -0,0 +1,588 @@
+"""Vector backend benchmark: recall@k vs latency vs memory.
+
+Every backend is built from the same embedded corpus and queried with the same
+query vectors. Builds and queries run in fresh processes, so load time and RSS
+are measured from a cold start. Recall@k is computed against an exact float32
+search of the corpus.
+
+With ``--dims``, every backend is also benchmarked on the corpus reduced to
+each dimension, by PCA or by truncation (text-embedding-3 embeddings keep most
+of their quality when truncated). Recall is still measured against the exact
+search at full dimension, so it includes the loss of the reduction.
+
+Usage:
+    python -m pi_agent_core.benchmarks.retrieval_benchmark --corpus synthetic --size 100000 --dim 1024
+    python -m pi_agent_core.benchmarks.retrieval_benchmark --corpus knowledge_base --backends faiss chroma numpy-int8
+    python -m pi_agent_core.benchmarks.retrieval_benchmark --corpus knowledge_base --dims 1536 768 256 --reduction truncate
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+import joblib
+import numpy as np
+
+from config.config import (
+    PATH_LOCAL_STORAGE_CHUNKED_DATA_JOBLIB_FILE,
+    INDEX_INSERT_BATCH_SIZE,
+    CHROMA_COLLECTION_NAME,
+    CHROMA_HNSW_M,
+    CHROMA_HNSW_CONSTRUCTION_EF,
+    CHROMA_HNSW_SEARCH_EF,
+    NUMPY_VECTOR_STORE_RESCORE_FACTOR,
+    EMBEDDING_PCA_MAX_SAMPLES,
+)
+from pi_agent_core.infraestructure.projected_embedding import EmbeddingProjection
+from pi_agent_core.infraestructure.numpy_vector_store import normalize
+
+if TYPE_CHECKING:
+    from llama_index.core.vector_stores.types import BasePydanticVectorStore
+
+BACKENDS = (
+    "simple",
+    "faiss",
+    "chroma",
+    "numpy-float32",
+    "numpy-float16",
+    "numpy-int8",
+)
+
+REDUCTIONS = ("pca", "truncate")
+
+# Number of corpus rows processed at a time when generating or searching it
+BLOCK_SIZE = 65536
+
+
+def _rss_mb() -> float:
+    """Returns the resident set size of the current process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+
+        # Peak RSS, in KB on Linux and in bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _disk_mb(path: str) -> float:
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 2**20
+    return (
+        sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+        / 2**20
+    )
+
+
+def generate_synthetic_corpus(path: str, size: int, dim: int, seed: int = 0) -> None:
+    """Writes a clustered synthetic corpus of normalized vectors as a .npy file.
+
+    Vectors are drawn around one random center per 100 vectors, which is closer
+    to real embeddings than uniform noise. The corpus is generated block by
+    block, so it can be larger than the available memory.
+
+    Args:
+        path (str): Destination .npy file.
+        size (int): Number of vectors.
+        dim (int): Vector dimension.
+        seed (int): Random seed.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, size // 100), dim), dtype=np.float32)
+    corpus = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=(size, dim)
+    )
+    for start in range(0, size, BLOCK_SIZE):
+        end = min(start + BLOCK_SIZE, size)
+        assigned = centers[rng.integers(0, len(centers), end - start)]
+        noise = rng.standard_normal((end - start, dim), dtype=np.float32)
+        corpus[start:end] = normalize(assigned + noise)
+    corpus.flush()
+
+
+def embed_knowledge_base(path: str) -> None:
+    """Embeds the chunked knowledge base with the configured embedding model.
+
+    Requires a previous index build, which saves the chunked documents.
+
+    Args:
+        path (str): Destination .npy file.
+    """
+    from llama_index.core import Settings
+    from llama_index.core.schema import MetadataMode
+    from pi_agent_core.infraestructure.ai_service import set_service_context
+
+    set_service_context()
+    nodes = joblib.load(PATH_LOCAL_STORAGE_CHUNKED_DATA_JOBLIB_FILE)
+    embeddings = Settings.embed_model.get_text_embedding_batch(
+        [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes],
+        show_progress=True,
+    )
+    np.save(path, normalize(np.asarray(embeddings, dtype=np.float32)))
+
+
+def make_queries(
+    corpus: np.ndarray, n_queries: int, noise: float, seed: int = 1
+) -> np.ndarray:
+    """Builds query vectors by perturbing random corpus vectors.
+
+    Args:
+        corpus (np.ndarray): The normalized corpus.
+        n_queries (int): Number of queries, at least 2: the first one is timed
+                         apart from the latency percentiles.
+        noise (float): Norm of the random perturbation.
+        seed (int): Random seed.
+
+    Returns:
+        np.ndarray: The normalized queries.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.sort(
+        rng.choice(len(corpus), size=n_queries, replace=n_queries > len(corpus))
+    )
+    perturbation = rng.standard_normal((n_queries, corpus.shape[1]), dtype=np.float32)
+    perturbation *= noise / np.sqrt(corpus.shape[1])
+    return normalize(np.asarray(corpus[rows]) + perturbation)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Finds the exact top k corpus rows of every query by cosine similarity.
+
+    Args:
+        corpus (np.ndarray): The normalized corpus.
+        queries (np.ndarray): The normalized queries.
+        k (int): Number of neighbours.
+
+    Returns:
+        np.ndarray: A (n_queries, k) array of corpus rows.
+    """
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    for start in range(0, len(corpus), BLOCK_SIZE):
+        end = min(start + BLOCK_SIZE, len(corpus))
+        scores = np.concatenate(
+            [best_scores, queries @ np.asarray(corpus[start:end]).T], axis=1
+        )
+        rows = np.concatenate(
+            [
+                best_rows,
+                np.broadcast_to(np.arange(start, end), (len(queries), end - start)),
+            ],
+            axis=1,
+        )
+        if scores.shape[1] > k:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, top, axis=1)
+            rows = np.take_along_axis(rows, top, axis=1)
+        best_scores, best_rows = scores, rows
+
+    return best_rows
+
+
+def reduce_corpus(
+    corpus_path: str, queries: np.ndarray, dim: int, reduction: str, path: str
+) -> np.ndarray:
+    """Writes the corpus reduced to ``dim`` dimensions and reduces the queries.
+
+    Args:
+        corpus_path (str): The normalized corpus, as a .npy file.
+        queries (np.ndarray): The normalized queries.
+        dim (int): Target dimension.
+        reduction (str): "pca", fit on a sample of the corpus, or "truncate",
+                         which keeps the first ``dim`` dimensions.
+        path (str): Destination .npy file of the reduced corpus.
+
+    Returns:
+        np.ndarray: The reduced and normalized queries.
+    """
+    corpus = np.load(corpus_path, mmap_mode="r")
+    if reduction == "pca":
+        rng = np.random.default_rng(0)
+        sample = np.sort(
+            rng.choice(
+                len(corpus),
+                min(len(corpus), EMBEDDING_PCA_MAX_SAMPLES),
+                replace=False,
+            )
+        )
+        projection = EmbeddingProjection.fit(
+            corpus[sample], dim=dim, max_samples=EMBEDDING_PCA_MAX_SAMPLES
+        )
+        transform: Callable[[np.ndarray], np.ndarray] = projection.transform
+        dim = projection.output_dim
+    else:
+
+        def truncate(vectors: np.ndarray) -> np.ndarray:
+            return normalize(vectors[:, :dim])
+
+        transform = truncate
+
+    reduced = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=(len(corpus), dim)
+    )
+    for start in range(0, len(corpus), BLOCK_SIZE):
+        end = min(start + BLOCK_SIZE, len(corpus))
+        reduced[start:end] = transform(np.asarray(corpus[start:end]))
+    reduced.flush()
+
+    return transform(queries)
+
+
+def _backend_path(backend: str, backend_dir: str) -> str:
+    """Returns where a backend is persisted inside its directory."""
+    if backend == "simple":
+        return os.path.join(backend_dir, "vector_store.json")
+    if backend == "faiss":
+        return os.path.join(backend_dir, "faiss.index")
+    if backend == "chroma":
+        return backend_dir
+    return os.path.join(backend_dir, "default__vector_store.json")
+
+
+def build_backend(
+    backend: str, corpus_path: str, backend_dir: str, params: dict
+) -> dict:
+    """Builds and persists one backend from the corpus. Runs in a fresh process.
+
+    Returns:
+        dict: The build time in seconds.
+    """
+    from llama_index.core.schema import TextNode
+
+    corpus = np.load(corpus_path, mmap_mode="r")
+    start_time = time.perf_counter()
+
+    vector_store: "BasePydanticVectorStore"
+    if backend == "simple":
+        from llama_index.core.vector_stores import SimpleVectorStore
+
+        vector_store = SimpleVectorStore()
+    elif backend == "faiss":
+        from pi_agent_core.infraestructure.faiss_vector_store import (
+            FilterableFaissVectorStore,
+        )
+
+        # Built like the service index, on the dimension of the first embedding
+        vector_store = FilterableFaissVectorStore()
+    elif backend == "chroma":
+        import chromadb
+        from pi_agent_core.infraestructure.chroma_vector_store import (
+            BulkChromaVectorStore,
+            get_chroma_collection_metadata,
+        )
+
+        client = chromadb.PersistentClient(path=backend_dir)
+        metadata = get_chroma_collection_metadata()
+        metadata.update(
+            {
+                "hnsw:M": params["hnsw_m"],
+                "hnsw:construction_ef": params["hnsw_construction_ef"],
+                "hnsw:search_ef": params["hnsw_search_ef"],
+            }
+        )
+        collection = client.create_collection(CHROMA_COLLECTION_NAME, metadata=metadata)
+        vector_store = BulkChromaVectorStore(
+            chroma_collection=collection, chroma_client=client
+        )
+    else:
+        from pi_agent_core.infraestructure.numpy_vector_store import NumpyVectorStore
+
+        vector_store = NumpyVectorStore(dtype=backend.split("-", 1)[1])
+
+    for batch_start in range(0, len(corpus), INDEX_INSERT_BATCH_SIZE):
+        batch = np.asarray(corpus[batch_start : batch_start + INDEX_INSERT_BATCH_SIZE])
+        nodes = [
+            TextNode(id_=str(row), text=str(row), embedding=embedding.tolist())
+            for row, embedding in enumerate(batch, start=batch_start)
+        ]
+        vector_store.add(nodes)
+
+    if backend != "chroma":
+        vector_store.persist(_backend_path(backend, backend_dir))
+
+    return {"build_s": time.perf_counter() - start_time}
+
+
+def query_backend(
+    backend: str, backend_dir: str, queries_path: str, k: int, params: dict
+) -> dict:
+    """Loads one backend and runs every query against it. Runs in a fresh process.
+
+    Returns:
+        dict: The load time, the query latencies, the retrieved rows and the RSS growth.
+    """
+    from llama_index.core.vector_stores.types import VectorStoreQuery
+
+    queries = np.load(queries_path)
+    persist_path = _backend_path(backend, backend_dir)
+    base_rss = _rss_mb()
+    start_time = time.perf_counter()
+
+    vector_store: "BasePydanticVectorStore"
+    if backend == "simple":
+        from llama_index.core.vector_stores import SimpleVectorStore
+
+        vector_store = SimpleVectorStore.from_persist_path(persist_path)
+    elif backend == "faiss":
+        from pi_agent_core.infraestructure.faiss_vector_store import (
+            FilterableFaissVectorStore,
+        )
+
+        vector_store = FilterableFaissVectorStore.from_persist_path(persist_path)
+    elif backend == "chroma":
+        import chromadb
+        from llama_index.vector_stores.chroma import ChromaVectorStore
+        from pi_agent_core.infraestructure.chroma_vector_store import (
+            warm_up_chroma_collection,
+        )
+
+        collection = chromadb.PersistentClient(path=persist_path).get_collection(
+            CHROMA_COLLECTION_NAME
+        )
+        warm_up_chroma_collection(collection)
+        vector_store = ChromaVectorStore(chroma_collection=collection)
+    else:
+        from pi_agent_core.infraestructure.numpy_vector_store import NumpyVectorStore
+
+        vector_store = NumpyVectorStore.from_persist_path(
+            persist_path,
+            rescore=params["rescore"],
+            rescore_factor=params["rescore_factor"],
+        )
+    load_s = time.perf_counter() - start_time
+
+    retrieved = np.full((len(queries), k), -1, dtype=np.int64)
+    latencies_ms: List[float] = []
+    first_query_ms = None
+    for i, query in enumerate(queries):
+        start_time = time.perf_counter()
+        result = vector_store.query(
+            VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=k)
+        )
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        if first_query_ms is None:
+            # The first query pays for the cold caches, it's reported apart
+            first_query_ms = elapsed_ms
+        else:
+            latencies_ms.append(elapsed_ms)
+        rows = [int(node_id) for node_id in (result.ids or [])[:k]]
+        retrieved[i, : len(rows)] = rows
+
+    return {
+        "load_s": load_s,
+        "first_query_ms": first_query_ms,
+        "latencies_ms": latencies_ms,
+        "retrieved": retrieved,
+        "rss_mb": _rss_mb() - base_rss,
+    }
+
+
+def _run_in_fresh_process(function, *args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(function, *args).result()
+
+
+def recall_at_k(retrieved: np.ndarray, expected: np.ndarray) -> float:
+    """Returns the mean share of the exact top k rows found by the backend."""
+    k = expected.shape[1]
+    return float(
+        np.mean(
+            [
+                len(set(found.tolist()) & set(exact.tolist())) / k
+                for found, exact in zip(retrieved, expected)
+            ]
+        )
+    )
+
+
+def run_benchmark(
+    backends: list,
+    corpus_path: str,
+    n_queries: int,
+    k: int,
+    query_noise: float,
+    workdir: str,
+    params: dict,
+    dims: Optional[list] = None,
+    reduction: str = "pca",
+) -> list:
+    """Builds, loads and queries every backend on the same corpus and queries.
+
+    Args:
+        backends (list): Backends to benchmark, from BACKENDS.
+        corpus_path (str): The normalized corpus, as a .npy file.
+        n_queries (int): Number of queries.
+        k (int): Number of neighbours retrieved per query.
+        query_noise (float): Norm of the perturbation applied to build the queries.
+        workdir (str): Directory where the backends are persisted.
+        params (dict): Backend parameters (HNSW settings, re-scoring).
+        dims (Optional[list]): Reduced dimensions to benchmark besides the full one.
+        reduction (str): How the corpus is reduced, from REDUCTIONS.
+
+    Returns:
+        list: One result dictionary per backend and dimension.
+    """
+    if n_queries < 2:
+        raise ValueError(f"At least 2 queries are needed, got {n_queries}")
+
+    corpus = np.load(corpus_path, mmap_mode="r")
+    queries = make_queries(corpus, n_queries=n_queries, noise=query_noise)
+    expected = exact_top_k(corpus, queries, k)
+
+    # (dim, corpus path, queries) of every variant, starting with the full corpus
+    variants = [(int(corpus.shape[1]), corpus_path, queries)]
+    for dim in dims or []:
+        if dim >= corpus.shape[1]:
+            continue
+        logging.info(f"Reducing the corpus to {dim} dimensions ({reduction})")
+        reduced_path = os.path.join(workdir, f"corpus-{dim}.npy")
+        reduced_queries = reduce_corpus(
+            corpus_path, queries, dim=dim, reduction=reduction, path=reduced_path
+        )
+        variants.append((dim, reduced_path, reduced_queries))
+
+    results = []
+    for dim, variant_path, variant_queries in variants:
+        queries_path = os.path.join(workdir, f"queries-{dim}.npy")
+        np.save(queries_path, variant_queries)
+
+        for backend in backends:
+            logging.info(f"Benchmarking {backend} at {dim} dimensions")
+            backend_dir = os.path.join(workdir, f"{backend}-{dim}")
+            os.makedirs(backend_dir, exist_ok=True)
+
+            build = _run_in_fresh_process(
+                build_backend, backend, variant_path, backend_dir, params
+            )
+            query = _run_in_fresh_process(
+                query_backend, backend, backend_dir, queries_path, k, params
+            )
+            results.append(
+                {
+                    "backend": backend,
+                    "size": int(corpus.shape[0]),
+                    "dim": dim,
+                    "build_s": build["build_s"],
+                    "load_s": query["load_s"],
+                    "first_query_ms": query["first_query_ms"],
+                    "p50_ms": float(np.percentile(query["latencies_ms"], 50)),
+                    "p99_ms": float(np.percentile(query["latencies_ms"], 99)),
+                    "rss_mb": query["rss_mb"],
+                    "disk_mb": _disk_mb(backend_dir),
+                    f"recall@{k}": recall_at_k(query["retrieved"], expected),
+                }
+            )
+
+    return results
+
+
+def print_report(results: list) -> None:
+    """Prints the benchmark results as a table."""
+    if not results:
+        return
+    columns = list(results[0])
+    widths = [max(len(column), 12) for column in columns]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        cells = [
+            f"{value:.4g}" if isinstance(value, float) else str(value)
+            for value in result.values()
+        ]
+        print("  ".join(cell.rjust(width) for cell, width in zip(cells, widths)))
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the vector backends.")
+    parser.add_argument(
+        "--corpus",
+        default="synthetic",
+        help="'synthetic', 'knowledge_base' or the path of a .npy corpus",
+    )
+    parser.add_argument("--size", type=int, default=10000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=3072, help="Synthetic corpus dim")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument(
+        "--queries", type=int, default=200, help="Number of queries, at least 2"
+    )
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--query-noise", type=float, default=0.5)
+    parser.add_argument("--hnsw-m", type=int, default=CHROMA_HNSW_M)
+    parser.add_argument(
+        "--hnsw-construction-ef", type=int, default=CHROMA_HNSW_CONSTRUCTION_EF
+    )
+    parser.add_argument("--hnsw-search-ef", type=int, default=CHROMA_HNSW_SEARCH_EF)
+    parser.add_argument("--no-rescore", action="store_true")
+    parser.add_argument(
+        "--rescore-factor", type=int, default=NUMPY_VECTOR_STORE_RESCORE_FACTOR
+    )
+    parser.add_argument(
+        "--dims",
+        type=int,
+        nargs="+",
+        default=[],
+        help="Also benchmark the corpus reduced to these dimensions",
+    )
+    parser.add_argument("--reduction", choices=REDUCTIONS, default="pca")
+    parser.add_argument("--workdir", help="Kept after the run if given")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+    if args.queries < 2:
+        parser.error("--queries must be at least 2")
+
+    logging.basicConfig(level=logging.INFO)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="retrieval_benchmark_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        if args.corpus == "synthetic":
+            corpus_path = os.path.join(workdir, "corpus.npy")
+            generate_synthetic_corpus(corpus_path, size=args.size, dim=args.dim)
+        elif args.corpus == "knowledge_base":
+            corpus_path = os.path.join(workdir, "corpus.npy")
+            embed_knowledge_base(corpus_path)
+        else:
+            corpus_path = args.corpus
+
+        params = {
+            "hnsw_m": args.hnsw_m,
+            "hnsw_construction_ef": args.hnsw_construction_ef,
+            "hnsw_search_ef": args.hnsw_search_ef,
+            "rescore": not args.no_rescore,
+            "rescore_factor": args.rescore_factor,
+        }
+        results = run_benchmark(
+            backends=args.backends,
+            corpus_path=corpus_path,
+            n_queries=args.queries,
+            k=args.top_k,
+            query_noise=args.query_noise,
+            workdir=workdir,
+            params=params,
+            dims=args.dims,
+            reduction=args.reduction,
+        )
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
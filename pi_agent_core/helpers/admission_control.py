@@ -0,0 +1,212 @@
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from functools import lru_cache
+from typing import Optional
+
+from config.config import (
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_MAX_QUEUE_SIZE,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+)
+from pi_agent_core.models import AdmissionStats
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being admitted.
+
+    Attributes:
+        status_code (int): 429 when the queue is full, 503 when the request deadline can't be met.
+        retry_after (int): Seconds after which the client may retry.
+    """
+
+    def __init__(self, status_code: int, message: str, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Limits the requests processed at the same time and queues the rest.
+
+    Waiting requests are kept in a bounded priority queue (lower value first,
+    FIFO within a priority) and are admitted as running requests finish. A
+    request is shed with a fast rejection when:
+        - the queue is full and it does not outrank any queued request (429),
+        - the expected wait already exceeds its deadline (503),
+        - its deadline passes while it is still queued (503).
+
+    The expected wait is estimated from a moving average of the service time.
+    All methods must be called from the event loop thread.
+    """
+
+    # Weight of the last request in the service time moving average
+    SERVICE_TIME_SMOOTHING = 0.2
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue_size: int,
+        queue_timeout: float,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+
+        self._in_flight = 0
+        # Heap of [priority, sequence, future]; entries whose future is done are stale
+        self._waiters: list = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._service_time: Optional[float] = None
+
+        self._admitted = 0
+        self._shed_queue_full = 0
+        self._shed_deadline = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def _expected_wait(self, position: int) -> float:
+        """Estimates how long a request at the given queue position will wait."""
+        if self._service_time is None:
+            return 0.0
+        return math.ceil(position / self.max_in_flight) * self._service_time
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._expected_wait(self._queued + 1)))
+
+    def _lowest_priority_waiter(self) -> Optional[list]:
+        live_waiters = [entry for entry in self._waiters if not entry[2].done()]
+        if not live_waiters:
+            return None
+        return max(live_waiters, key=lambda entry: (entry[0], entry[1]))
+
+    async def acquire(self, priority: int, timeout: Optional[float] = None) -> float:
+        """Waits for a processing slot.
+
+        Args:
+            priority (int): Priority of the request, lower values are admitted first.
+            timeout (Optional[float]): Max seconds the request may wait before starting.
+                                       Capped to, and defaulting to, the queue timeout.
+
+        Raises:
+            AdmissionRejected: If the request is shed.
+
+        Returns:
+            float: The seconds the request waited in the queue.
+        """
+        if timeout is None:
+            timeout = self.queue_timeout
+        timeout = min(timeout, self.queue_timeout)
+
+        if self._in_flight < self.max_in_flight and self._queued == 0:
+            self._in_flight += 1
+            self._admitted += 1
+            return 0.0
+
+        if self._queued >= self.max_queue_size:
+            lowest = self._lowest_priority_waiter()
+            if lowest is None or lowest[0] <= priority:
+                self._shed_queue_full += 1
+                raise AdmissionRejected(429, "Queue is full", self._retry_after())
+            # Make room by shedding the lowest priority queued request
+            lowest[2].set_exception(
+                AdmissionRejected(
+                    429, "Shed by a higher priority request", self._retry_after()
+                )
+            )
+            self._queued -= 1
+            self._shed_queue_full += 1
+
+        position = sum(
+            1 for entry in self._waiters if entry[0] <= priority and not entry[2].done()
+        )
+        if self._expected_wait(position + 1) > timeout:
+            self._shed_deadline += 1
+            raise AdmissionRejected(
+                503, "Request deadline can't be met", self._retry_after()
+            )
+
+        start_time = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._sequence), future])
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._queued -= 1
+            self._shed_deadline += 1
+            raise AdmissionRejected(
+                503, "Request deadline expired in queue", self._retry_after()
+            )
+        except asyncio.CancelledError:
+            # The client went away. If a slot was handed over meanwhile, pass it on
+            if future.cancelled():
+                self._queued -= 1
+            elif future.exception() is None:
+                self.release(service_time=None)
+            raise
+
+        wait_time = time.perf_counter() - start_time
+        self._admitted += 1
+        self._total_wait_time += wait_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+        return wait_time
+
+    def release(self, service_time: Optional[float]) -> None:
+        """Frees a processing slot, handing it to the next queued request if any.
+
+        Args:
+            service_time (Optional[float]): Seconds the finished request took,
+                                            used to estimate queue wait times.
+        """
+        if service_time is not None:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += self.SERVICE_TIME_SMOOTHING * (
+                    service_time - self._service_time
+                )
+
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # The slot is transferred, so the in-flight count does not change
+                self._queued -= 1
+                future.set_result(None)
+                return
+
+        self._in_flight -= 1
+
+    def stats(self) -> AdmissionStats:
+        """Returns the current load and the admission counters."""
+        return AdmissionStats(
+            in_flight=self._in_flight,
+            queued=self._queued,
+            max_in_flight=self.max_in_flight,
+            max_queue_size=self.max_queue_size,
+            admitted=self._admitted,
+            shed_queue_full=self._shed_queue_full,
+            shed_deadline=self._shed_deadline,
+            avg_wait_time=self._total_wait_time / self._admitted
+            if self._admitted
+            else 0.0,
+            max_wait_time=self._max_wait_time,
+            avg_service_time=self._service_time or 0.0,
+        )
+
+
+@lru_cache(maxsize=None)
+def get_admission_controller() -> AdmissionController:
+    """Creates, once per process, the admission controller of the predict endpoint.
+
+    Returns:
+        AdmissionController: The controller configured in config/config.py.
+    """
+    return AdmissionController(
+        max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+        max_queue_size=ADMISSION_MAX_QUEUE_SIZE,
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    )
@@ -0,0 +1,330 @@
+import os
+import re
+import sys
+import time
+import uuid
+import hmac
+import random
+import asyncio
+import logging
+import functools
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, Token
+from typing import Any, Callable, ContextManager, Iterator, List, Optional, Set
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from config.config import (
+    PROFILING_DIR,
+    PROFILING_ADMIN_TOKEN,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_INTERVAL_SECONDS,
+    PROFILING_MAX_CAPTURES,
+)
+from pi_agent_core.models import ProfileCapture
+
+CAPTURE_SUFFIX = ".folded"
+CAPTURE_NAME_PATTERN = re.compile(r"^[\w.-]+\.folded$")
+
+
+def is_admin(admin_token: Optional[str]) -> bool:
+    """Checks a token against PROFILING_ADMIN_TOKEN, always False when it is unset."""
+    if not PROFILING_ADMIN_TOKEN or not admin_token:
+        return False
+    # Compared as bytes: compare_digest rejects non-ASCII str
+    return hmac.compare_digest(admin_token.encode(), PROFILING_ADMIN_TOKEN.encode())
+
+
+def should_profile(requested: bool, admin_token: Optional[str]) -> bool:
+    """Decides whether to profile a request.
+
+    Args:
+        requested (bool): Whether the request asked to be profiled.
+        admin_token (Optional[str]): The admin token sent with the request.
+
+    Returns:
+        bool: True if an admin asked for it, or the request was sampled.
+    """
+    if requested and is_admin(admin_token):
+        return True
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    label = f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    # ";" separates the frames of a folded stack
+    return label.replace(";", ":")
+
+
+class SamplingProfiler:
+    """Samples the call stacks of a set of threads at a fixed interval.
+
+    A daemon thread reads the stacks of the target threads, so the profiled code
+    runs unmodified. Samples are wall-clock: a request waiting on the LLM shows
+    up in the socket frames of the HTTP client, and Python work such as pydantic
+    parsing shows up in its own frames. The result is written in the folded
+    stack format read by flamegraph.pl, speedscope and inferno.
+
+    When the profiled thread runs an event loop, it also runs the tasks of other
+    requests. Given the profiled task, the thread is only sampled while it runs
+    that task or waits for events, so other tasks are not counted.
+    """
+
+    def __init__(
+        self, thread_id: int, interval: float, task: Optional[asyncio.Task] = None
+    ):
+        self.thread_ids: Set[int] = {thread_id}
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._loop_thread_id = thread_id if task is not None else None
+        self._task = task
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _runs_other_task(self) -> bool:
+        """Whether the event loop thread is running another task than the profiled one."""
+        if self._task is None:
+            return False
+        current_task = asyncio.current_task(self._task.get_loop())
+        return current_task is not None and current_task is not self._task
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            skip_loop_thread = self._runs_other_task()
+            for thread_id in list(self.thread_ids):
+                if skip_loop_thread and thread_id == self._loop_thread_id:
+                    continue
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """Returns the samples as folded stacks, one "frame;frame;frame count" per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+
+class ProfilingSession:
+    """Profiles the calling thread for the duration of a with block.
+
+    Threads running code on behalf of the block join the profile through
+    ``profile_current_thread``. Entered from a coroutine, only the samples of its
+    task are kept for the event loop thread. The capture is saved as
+    ``<time>-<name>-<pid>-<id>.folded`` in PROFILING_DIR, from a separate thread
+    so the event loop doesn't wait on the disk.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.capture_name: Optional[str] = None
+        self._profiler: Optional[SamplingProfiler] = None
+        self._token: Optional[Token] = None
+        self._save_thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ProfilingSession":
+        self._start_time = time.time()
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            # Not in an event loop, e.g. an index build
+            task = None
+        self._profiler = SamplingProfiler(
+            thread_id=threading.get_ident(),
+            interval=PROFILING_INTERVAL_SECONDS,
+            task=task,
+        )
+        self._profiler.start()
+        self._token = _active_session.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._token is not None:
+            _active_session.reset(self._token)
+        profiler = self._profiler
+        if profiler is None:
+            return
+        profiler.stop()
+        timestamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(self._start_time))
+        self.capture_name = (
+            f"{timestamp}-{self.name}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            f"{CAPTURE_SUFFIX}"
+        )
+        self._save_thread = threading.Thread(
+            target=self._save, args=(self.capture_name, profiler)
+        )
+        self._save_thread.start()
+
+    def _save(self, capture_name: str, profiler: SamplingProfiler) -> None:
+        """Writes the capture and prunes the old ones, off the profiled thread."""
+        try:
+            save_capture(capture_name, profiler.folded())
+            logging.info(
+                f"Profile of {self.name} saved as {capture_name} "
+                f"({sum(profiler.samples.values())} samples)"
+            )
+        except OSError as e:
+            # A full disk must not fail the profiled request
+            logging.error(f"Profile of {self.name} not saved: {str(e)}")
+
+
+# The session profiling the current request, copied into its worker threads
+_active_session: ContextVar[Optional[ProfilingSession]] = ContextVar(
+    "active_profiling_session", default=None
+)
+
+
+def profile(name: str, enabled: bool) -> ContextManager[Optional[ProfilingSession]]:
+    """Returns a context manager profiling its block when enabled.
+
+    When disabled it is a ``nullcontext``: no thread, no sampling, no allocation
+    beyond the call itself, so the hooks can stay in the production code path.
+
+    Args:
+        name (str): Name of the profiled operation, used in the capture name.
+        enabled (bool): Whether to profile.
+
+    Returns:
+        ContextManager[Optional[ProfilingSession]]: A ProfilingSession, or a no-op
+                                                    context manager.
+    """
+    if enabled:
+        return ProfilingSession(name)
+    return nullcontext()
+
+
+@contextmanager
+def profile_current_thread() -> Iterator[None]:
+    """Adds the calling thread to the active profiling session while in the block.
+
+    Does nothing outside a profiled request. The session is found through a
+    context variable, which the thread pool copies into the worker threads.
+    """
+    session = _active_session.get()
+    profiler = session._profiler if session is not None else None
+    thread_id = threading.get_ident()
+    if profiler is None or thread_id in profiler.thread_ids:
+        yield
+        return
+
+    profiler.thread_ids.add(thread_id)
+    try:
+        yield
+    finally:
+        profiler.thread_ids.discard(thread_id)
+
+
+def _in_request_profile(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wraps a sync endpoint so its worker thread joins the request profile."""
+
+    if getattr(endpoint, "_in_request_profile", False):
+        # Routes are created again when their router is included
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with profile_current_thread():
+            return endpoint(*args, **kwargs)
+
+    setattr(wrapper, "_in_request_profile", True)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """An API route profiled on demand, from its request to its response.
+
+    A request is profiled when an admin asks for it with the X-Profile and
+    X-Admin-Token headers, or when it is sampled. The event loop thread, which
+    parses and validates the body and serializes the response, is sampled while
+    it runs the request task or waits for events, and the worker thread of a
+    sync endpoint while the endpoint runs. Sync dependencies run in other worker
+    threads, and tasks spawned by the request aren't the request task, so
+    neither is sampled.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = _in_request_profile(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        route_handler = super().get_route_handler()
+        name = self.name
+
+        async def profiled_route_handler(request: Request) -> Response:
+            # Decided on the event loop, before the body is read, to stay cheap
+            if not should_profile(
+                requested="x-profile" in request.headers,
+                admin_token=request.headers.get("x-admin-token"),
+            ):
+                return await route_handler(request)
+            with ProfilingSession(name):
+                return await route_handler(request)
+
+        return profiled_route_handler
+
+
+def save_capture(capture_name: str, content: str) -> None:
+    """Writes a capture and deletes the oldest ones beyond PROFILING_MAX_CAPTURES."""
+    os.makedirs(PROFILING_DIR, exist_ok=True)
+    path = os.path.join(PROFILING_DIR, capture_name)
+    with open(f"{path}.tmp", "w") as f:
+        f.write(content)
+    os.replace(f"{path}.tmp", path)
+
+    for capture in list_captures()[PROFILING_MAX_CAPTURES:]:
+        try:
+            os.remove(os.path.join(PROFILING_DIR, capture.name))
+        except FileNotFoundError:
+            pass
+
+
+def list_captures() -> List[ProfileCapture]:
+    """Lists the saved captures, newest first.
+
+    Returns:
+        List[ProfileCapture]: The name, size and creation time of every capture.
+    """
+    if not os.path.isdir(PROFILING_DIR):
+        return []
+
+    captures = []
+    for entry in os.scandir(PROFILING_DIR):
+        if CAPTURE_NAME_PATTERN.match(entry.name):
+            stat = entry.stat()
+            captures.append(
+                ProfileCapture(
+                    name=entry.name, size_bytes=stat.st_size, created_at=stat.st_mtime
+                )
+            )
+
+    return sorted(captures, key=lambda capture: capture.created_at, reverse=True)
+
+
+def get_capture_path(capture_name: str) -> Optional[str]:
+    """Returns the path of a capture, or None if the name is invalid or unknown.
+
+    Args:
+        capture_name (str): The name of the capture.
+
+    Returns:
+        Optional[str]: The path of the capture file.
+    """
+    if not CAPTURE_NAME_PATTERN.match(capture_name):
+        return None
+    path = os.path.join(PROFILING_DIR, capture_name)
+    return path if os.path.isfile(path) else None
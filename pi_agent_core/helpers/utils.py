@@ -1,11 +1,22 @@
 import os
 import shutil
 import yaml
+from typing import List, Optional, cast
 
 from llama_index.core.program import LLMTextCompletionProgram
 from llama_index.core.settings import Settings
+from llama_index.core.vector_stores.types import (
+    MetadataFilter as VectorStoreMetadataFilter,
+    MetadataFilters,
+)
 from config.config import PI_AGENT_CONFIG
-from pi_agent_core.models import DetectLanguageOutput, TranslateLanguageOutput
+from pi_agent_core.models import (
+    DetectLanguageOutput,
+    TranslateLanguageOutput,
+    CondenseQuestionOutput,
+    SummarizeConversationOutput,
+    MetadataFilter,
+)
 
 
 def load_config_file(path: str) -> dict:
@@ -24,17 +35,41 @@ def load_config_file(path: str) -> dict:
     return params
 
 
-def delete_tmp_files(directory: str) -> None:
+def build_metadata_filters(
+    filters: Optional[List[MetadataFilter]],
+) -> Optional[MetadataFilters]:
+    """Converts the metadata filters of a request into vector store filters.
+
+    Args:
+        filters (Optional[List[MetadataFilter]]): The request filters, all of which must match.
+
+    Returns:
+        Optional[MetadataFilters]: The vector store filters, or None if there are none.
+    """
+    if not filters:
+        return None
+
+    return MetadataFilters(
+        filters=[
+            VectorStoreMetadataFilter.from_dict(item.model_dump()) for item in filters
+        ]
+    )
+
+
+def delete_tmp_files(directory: str, exclude: Optional[List[str]] = None) -> None:
     """Delete all files and folders that are inside the main folders of the directory folder.
 
     Args:
         directory (str): path of directory.
+        exclude (Optional[List[str]]): paths of the main folders to keep.
     """
+    excluded = {os.path.abspath(path) for path in exclude or []}
     # Get the list of folders inside the directory
     folders = [
         folder
         for folder in os.listdir(directory)
         if os.path.isdir(os.path.join(directory, folder))
+        and os.path.abspath(os.path.join(directory, folder)) not in excluded
     ]
 
     # Iterate through each folder and delete the files inside them
@@ -98,3 +133,51 @@ def check_and_translate_to_specific_language(
     )
     output = program()
     return output
+
+
+def condense_question(history: str, query: str) -> CondenseQuestionOutput:
+    """Rewrites a follow-up message as a standalone question using the conversation history.
+
+    Args:
+        history (str): The summary and recent turns of the conversation.
+        query (str): The follow-up message of the user.
+
+    Returns:
+        CondenseQuestionOutput: An object containing the standalone question.
+    """
+    agent_params = load_config_file(PI_AGENT_CONFIG)
+    SP = agent_params["llm_simple_program"]["condense_question_prompt"]
+    program = LLMTextCompletionProgram.from_defaults(
+        llm=Settings.llm,
+        output_cls=CondenseQuestionOutput,
+        prompt_template_str=SP,
+        verbose=True,
+    )
+    # Variables are passed at call time so braces in user text are not parsed
+    output = program(history=history, query=query)
+    return cast(CondenseQuestionOutput, output)
+
+
+def summarize_conversation(
+    summary: str, turns: str, max_words: int
+) -> SummarizeConversationOutput:
+    """Merges older conversation turns into the running summary of the conversation.
+
+    Args:
+        summary (str): The current summary, possibly empty.
+        turns (str): The conversation turns to fold into the summary.
+        max_words (int): The maximum length of the updated summary.
+
+    Returns:
+        SummarizeConversationOutput: An object containing the updated summary.
+    """
+    agent_params = load_config_file(PI_AGENT_CONFIG)
+    SP = agent_params["llm_simple_program"]["summarize_conversation_prompt"]
+    program = LLMTextCompletionProgram.from_defaults(
+        llm=Settings.llm,
+        output_cls=SummarizeConversationOutput,
+        prompt_template_str=SP,
+        verbose=True,
+    )
+    output = program(summary=summary, turns=turns, max_words=max_words)
+    return cast(SummarizeConversationOutput, output)
@@ -0,0 +1,68 @@
+"""Offline build of the single-file index snapshot.
+
+Builds the index of the knowledge base on the "numpy" vector store and exports
+it, with its docstore and the embedding model it was built with, as one
+versioned and checksummed file. Serving with ``VECTOR_STORE=snapshot`` then
+memory-maps that file instead of ingesting the knowledge base.
+
+Usage:
+    python -m pi_agent_core.index_generation.build_index_snapshot build --version 2024.12.1 [--profile]
+    python -m pi_agent_core.index_generation.build_index_snapshot verify
+"""
+
+import json
+import logging
+import argparse
+from typing import Optional
+
+from config.config import INDEX_SNAPSHOT_PATH
+from pi_agent_core.infraestructure.ai_service import set_service_context
+from pi_agent_core.helpers.profiling import profile
+from pi_agent_core.infraestructure.index_snapshot import verify_index_snapshot
+from pi_agent_core.index_generation.index_generation_process import (
+    create_index_from_knowleadge_base,
+)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build or verify an index snapshot.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the snapshot")
+    build_parser.add_argument("--output", default=INDEX_SNAPSHOT_PATH)
+    build_parser.add_argument(
+        "--version", default=None, help="Version label, defaults to the build time"
+    )
+    build_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Save a sampling profile of the build stages to the profiles directory",
+    )
+
+    verify_parser = subparsers.add_parser("verify", help="Check the snapshot checksums")
+    verify_parser.add_argument("--path", default=INDEX_SNAPSHOT_PATH)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "build":
+        set_service_context()
+        with profile("build_index_snapshot", enabled=args.profile):
+            create_index_from_knowleadge_base(
+                vector_store="snapshot",
+                snapshot_path=args.output,
+                snapshot_version=args.version,
+            )
+        args.path = args.output
+
+    manifest = verify_index_snapshot(args.path)
+    summary = {
+        key: manifest[key]
+        for key in ("version", "format_version", "embed_model", "dim", "dtype")
+    }
+    summary["nodes"] = manifest["arrays"]["ids"]["shape"][0]
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
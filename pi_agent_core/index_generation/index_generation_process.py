@@ -1,17 +1,27 @@
 import os
+import shutil
 import logging
 import joblib
+from typing import Optional, Sequence
 
 from llama_index.core import Document, SimpleDirectoryReader, VectorStoreIndex, Settings
 from llama_index.core.ingestion import IngestionPipeline
+from llama_index.core.schema import BaseNode, MetadataMode
 
 from config.config import (
+    CHROMA_COLLECTION_NAME,
     PATH_KNOWLEDGE_BASE,
+    CHROMA_PERSISTENT_CLIENT_PATH,
     PATH_LOCAL_STORAGE,
     PATH_LOCAL_STORAGE_TRANSFORMED_DATA,
     PATH_LOCAL_STORAGE_READING_DATA_JOBLIB_FILE,
     PATH_LOCAL_STORAGE_CHUNKED_DATA_JOBLIB_FILE,
     PATH_LOCAL_STORAGE_VECTOR_STORE,
+    PATH_LOCAL_STORAGE_INDEX_BUILDS,
+    INDEX_INSERT_BATCH_SIZE,
+    INDEX_SNAPSHOT_PATH,
+    EMBEDDING_DIMENSIONS,
+    EMBEDDING_PCA_MAX_SAMPLES,
     PI_AGENT_CONFIG,
     VECTOR_STORE,
 )
@@ -19,6 +29,25 @@ from pi_agent_core.index_generation.transformation_logic import (
     get_transformation_context,
 )
 from pi_agent_core.index_generation.vector_store_logic import get_storage_context
+from pi_agent_core.infraestructure.index_snapshot import write_index_snapshot
+from pi_agent_core.infraestructure.chroma_vector_store import (
+    chroma_collection_name,
+    delete_stale_chroma_collections,
+    get_chroma_client,
+)
+from pi_agent_core.infraestructure.index_version import (
+    delete_stale_index_builds,
+    index_build_lock,
+    index_build_path,
+    new_index_version,
+    read_index_version_info,
+    write_index_version,
+)
+from pi_agent_core.infraestructure.projected_embedding import (
+    PROJECTION_FILE_NAME,
+    EmbeddingProjection,
+    supports_native_dimensions,
+)
 from pi_agent_core.helpers.utils import load_config_file, delete_tmp_files
 
 
@@ -70,23 +99,90 @@ def transformation(documents: list) -> None:
     )
 
 
-def vectorization(documents: list[Document]) -> None:
+def project_embeddings(
+    nodes: Sequence[BaseNode], dim: int
+) -> Optional[EmbeddingProjection]:
+    """Embeds the nodes and reduces their embeddings to ``dim`` with PCA.
+
+    The reduction is skipped when the embeddings already have at most ``dim``
+    dimensions, or when there are too few nodes to fit ``dim`` components.
+
+    Args:
+        nodes (Sequence[BaseNode]): The nodes to embed. Their embedding is set to
+                                    the projected one.
+        dim (int): The target dimension.
+
+    Returns:
+        Optional[EmbeddingProjection]: The projection fit on the node embeddings,
+                                       or None if the reduction was skipped.
+    """
+    embeddings = Settings.embed_model.get_text_embedding_batch(
+        [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes],
+        show_progress=True,
+    )
+    input_dim = len(embeddings[0]) if embeddings else 0
+    n_samples = min(len(embeddings), EMBEDDING_PCA_MAX_SAMPLES)
+    if input_dim <= dim or n_samples < dim:
+        logging.warning(
+            f"Embeddings not reduced to {dim} dimensions: {n_samples} embeddings "
+            f"of dimension {input_dim}"
+        )
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+        return None
+
+    projection = EmbeddingProjection.fit(
+        embeddings, dim=dim, max_samples=EMBEDDING_PCA_MAX_SAMPLES
+    )
+    for node, embedding in zip(nodes, projection.transform(embeddings)):
+        node.embedding = embedding.tolist()
+
+    logging.info(
+        f"Embeddings reduced from {projection.input_dim} "
+        f"to {projection.output_dim} dimensions"
+    )
+    return projection
+
+
+def vectorization(
+    documents: list[Document],
+    vector_store: str = VECTOR_STORE,
+    chroma_collection_name: str = CHROMA_COLLECTION_NAME,
+    persist_dir: str = PATH_LOCAL_STORAGE_VECTOR_STORE,
+) -> VectorStoreIndex:
     """Converts the transformed documents into a vectorized format and stores the resulting index.
 
     Args:
         documents (list[Document]): List of transformed documents to vectorize.
+        vector_store (str): The type of vector store to build.
+        chroma_collection_name (str): Collection the "chroma" store is built into.
+        persist_dir (str): Folder the index is persisted in.
+
+    Returns:
+        VectorStoreIndex: The vectorized index.
 
     Process:
         - Loads the service and storage contexts.
-        - Creates a VectorStoreIndex from the documents.
-        - Saves the vectorized index to a temporary local directory.
+        - Reduces the embeddings with PCA if EMBEDDING_DIMENSIONS is set and the
+          embedding model can't return it natively.
+        - Creates a VectorStoreIndex from the documents, inserting them in batches of INDEX_INSERT_BATCH_SIZE.
+        - Saves the vectorized index to ``persist_dir``.
     """
 
     # Get the service and storage contexts.
     logging.info("getting service context")
     service_context = Settings
     logging.info("getting storage context")
-    storage_context = get_storage_context(vector_store=VECTOR_STORE)
+    storage_context = get_storage_context(
+        vector_store=vector_store, chroma_collection_name=chroma_collection_name
+    )
+
+    projection = None
+    if EMBEDDING_DIMENSIONS is not None and not supports_native_dimensions(
+        service_context.embed_model.model_name
+    ):
+        logging.info("fitting the embedding projection")
+        projection = project_embeddings(documents, dim=EMBEDDING_DIMENSIONS)
 
     # Create a VectorStoreIndex from the documents using the specified contexts
     logging.info("creating VectorStoreIndex")
@@ -94,29 +190,142 @@ def vectorization(documents: list[Document]) -> None:
         nodes=documents,
         service_context=service_context,
         storage_context=storage_context,
+        insert_batch_size=INDEX_INSERT_BATCH_SIZE,
         show_progress=True,
     )
-    # Create temporary vector_store folder
-    os.makedirs(PATH_LOCAL_STORAGE_VECTOR_STORE, exist_ok=True)
-    # Persist the index to the temporary local directory "vector_store".
-    vector_store_index.storage_context.persist(
-        persist_dir=PATH_LOCAL_STORAGE_VECTOR_STORE
-    )
+    os.makedirs(persist_dir, exist_ok=True)
+    vector_store_index.storage_context.persist(persist_dir=persist_dir)
+    # The queries are projected like the documents when the index is loaded
+    projection_path = os.path.join(persist_dir, PROJECTION_FILE_NAME)
+    if projection is not None:
+        projection.save(projection_path)
+    elif os.path.exists(projection_path):
+        os.remove(projection_path)
 
     logging.info("--- Finish vectorization process. Next step load process ---")
 
+    return vector_store_index
+
+
+def export_snapshot(
+    index: VectorStoreIndex,
+    snapshot_path: str,
+    version: Optional[str] = None,
+    persist_dir: str = PATH_LOCAL_STORAGE_VECTOR_STORE,
+) -> None:
+    """Exports the vectorized index as a single-file snapshot.
+
+    Args:
+        index (VectorStoreIndex): The index built on a "numpy" vector store.
+        snapshot_path (str): Path of the snapshot file.
+        version (Optional[str]): Version label of the snapshot.
+        persist_dir (str): Folder the index was persisted in, with its projection.
+    """
+    manifest = write_index_snapshot(
+        index=index,
+        snapshot_path=snapshot_path,
+        embed_model=Settings.embed_model,
+        version=version,
+        projection=EmbeddingProjection.load_from_dir(persist_dir),
+    )
 
-def create_index_from_knowleadge_base() -> None:
+    logging.info(
+        f"--- Exported index snapshot {manifest['version']} to {snapshot_path} ---"
+    )
+
+
+def create_index_from_knowleadge_base(
+    vector_store: str = VECTOR_STORE,
+    snapshot_path: str = INDEX_SNAPSHOT_PATH,
+    snapshot_version: Optional[str] = None,
+) -> None:
     """Orchestrates the entire process of creating an index from the knowledge base.
 
+    Args:
+        vector_store (str): The type of vector store to build. "snapshot" builds a
+                            "numpy" index and exports it to ``snapshot_path``.
+        snapshot_path (str): Path of the snapshot file.
+        snapshot_version (Optional[str]): Version label of the snapshot. Defaults
+                                          to a new index version.
+
+    Raises:
+        IndexBuildInProgressError: If another build of the node is running.
+
     Process:
+        - Takes the build lock, so concurrent builds can't overwrite each other.
         - Deletes temporary files from previous runs.
         - Executes the extraction, transformation, and vectorization steps sequentially.
-        - Saves the vectorized index in the specified storage location.
+        - Saves the vectorized index in a new folder named after its version.
+        - Exports the index as a snapshot, for the "snapshot" vector store.
+        - Records the version and folder of the build, so the API workers reload
+          the index. Files of the index being served are never overwritten.
+        - Deletes the folders, and for the "chroma" vector store the collections,
+          of older builds. The previous build is kept until the workers reload.
     """
-    delete_tmp_files(directory=PATH_LOCAL_STORAGE)
-    extraction()
-    documents = joblib.load(PATH_LOCAL_STORAGE_READING_DATA_JOBLIB_FILE)
-    transformation(documents=documents)
-    transformed_documents = joblib.load(PATH_LOCAL_STORAGE_CHUNKED_DATA_JOBLIB_FILE)
-    vectorization(transformed_documents)
+    with index_build_lock():
+        index_version = snapshot_version or new_index_version()
+        index_path = index_build_path(index_version)
+        # Workers serve the builds and the Chroma collections, only the
+        # intermediate data is deleted
+        delete_tmp_files(
+            directory=PATH_LOCAL_STORAGE,
+            exclude=[
+                CHROMA_PERSISTENT_CLIENT_PATH,
+                PATH_LOCAL_STORAGE_INDEX_BUILDS,
+                PATH_LOCAL_STORAGE_VECTOR_STORE,
+            ],
+        )
+        # A snapshot version label may be reused
+        shutil.rmtree(index_path, ignore_errors=True)
+        extraction()
+        documents = joblib.load(PATH_LOCAL_STORAGE_READING_DATA_JOBLIB_FILE)
+        transformation(documents=documents)
+        transformed_documents = joblib.load(PATH_LOCAL_STORAGE_CHUNKED_DATA_JOBLIB_FILE)
+        if vector_store == "snapshot":
+            index = vectorization(
+                transformed_documents, vector_store="numpy", persist_dir=index_path
+            )
+            export_snapshot(
+                index,
+                snapshot_path=snapshot_path,
+                version=index_version,
+                persist_dir=index_path,
+            )
+        elif vector_store == "chroma":
+            # Built into a new collection, the workers switch to it when they reload
+            collection_name = chroma_collection_name(index_version)
+            vectorization(
+                transformed_documents,
+                vector_store=vector_store,
+                chroma_collection_name=collection_name,
+                persist_dir=index_path,
+            )
+        else:
+            vectorization(
+                transformed_documents, vector_store=vector_store, persist_dir=index_path
+            )
+
+        # Workers keep serving the previous build until they reload
+        previous_info = read_index_version_info() or {}
+        if vector_store == "chroma":
+            write_index_version(
+                index_version,
+                vector_store=vector_store,
+                index_path=index_path,
+                chroma_collection=collection_name,
+            )
+            delete_stale_chroma_collections(
+                get_chroma_client(),
+                keep=[
+                    collection_name,
+                    previous_info.get("chroma_collection", CHROMA_COLLECTION_NAME),
+                ],
+            )
+        else:
+            write_index_version(
+                index_version, vector_store=vector_store, index_path=index_path
+            )
+        delete_stale_index_builds(
+            keep=[index_path, previous_info.get("index_path", index_path)]
+        )
+        logging.info(f"Index version {index_version} recorded")
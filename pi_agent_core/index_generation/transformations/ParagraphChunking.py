@@ -1,12 +1,20 @@
 import uuid
 
 from typing import List, Any
-from llama_index.core.schema import BaseNode, TransformComponent, TextNode
+from llama_index.core.schema import (
+    BaseNode,
+    NodeRelationship,
+    TransformComponent,
+    TextNode,
+)
 
 
 class ParagraphChunking(TransformComponent):
     """A class that splits text into smaller chunks using double line breaks as delimiters.
-    The objective is to divide the text into node paragraphs.
+    The objective is to divide the text into node paragraphs. Every node keeps the
+    metadata of its source document, such as the file name or page, and a link to it.
+    The metadata is only kept for filtering and references: it is excluded from the
+    embedded and LLM text, which stay the paragraph text.
     """
 
     def __call__(self, documents: List[BaseNode], **kwargs: Any) -> List[BaseNode]:
@@ -16,11 +24,14 @@ class ParagraphChunking(TransformComponent):
             documents (List[BaseNode]): A list of documents to be chunked.
 
         Returns:
-            List[BaseNode]: A list of new BaseNode objects, each containing a chunk of text.
+            List[BaseNode]: A list of new BaseNode objects, each containing a chunk of text
+                            and the metadata of its document.
         """
         new_nodes = []
         for doc in documents:
             text = doc.text
+            # File paths, sizes and dates would otherwise be embedded with the text
+            excluded_keys = list(doc.metadata)
             new_chunks = [
                 chunk.strip() for chunk in text.split("\n\n") if chunk.strip()
             ]
@@ -29,6 +40,10 @@ class ParagraphChunking(TransformComponent):
                 node = TextNode(
                     id_=str(uuid.uuid4()),
                     text=chunk,
+                    metadata=dict(doc.metadata),
+                    excluded_embed_metadata_keys=excluded_keys,
+                    excluded_llm_metadata_keys=list(excluded_keys),
+                    relationships={NodeRelationship.SOURCE: doc.as_related_node_info()},
                 )
                 new_nodes.append(node)
 
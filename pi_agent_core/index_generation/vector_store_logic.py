@@ -1,43 +1,60 @@
-import faiss
 import logging
-import chromadb
 
-from config.config import CHROMA_PERSISTENT_CLIENT_PATH, CHROMA_COLLECTION_NAME
+from config.config import (
+    CHROMA_COLLECTION_NAME,
+    NUMPY_VECTOR_STORE_DTYPE,
+)
+from pi_agent_core.infraestructure.numpy_vector_store import NumpyVectorStore
+from pi_agent_core.infraestructure.faiss_vector_store import FilterableFaissVectorStore
+from pi_agent_core.infraestructure.chroma_vector_store import (
+    BulkChromaVectorStore,
+    get_chroma_client,
+    recreate_chroma_collection,
+)
 
-from llama_index.vector_stores.faiss import FaissVectorStore
 from llama_index.core import (
     StorageContext,
 )
-from llama_index.vector_stores.chroma import ChromaVectorStore
 
 
-def get_storage_context(vector_store: str = "simple") -> StorageContext:
+def get_storage_context(
+    vector_store: str = "simple", chroma_collection_name: str = CHROMA_COLLECTION_NAME
+) -> StorageContext:
     """Creates a storage context based on the specified vector store type.
 
     Args:
         vector_store (str): The type of vector store to use. Options are:
             - "faiss": Uses FAISS for similarity search.
-            - "chroma": Uses Chroma for persistent storage.
+            - "chroma": Uses Chroma for persistent storage, local or through a server.
+            - "numpy": Uses a memory-mapped, optionally quantized NumPy matrix.
             - "simple" (default): Uses the default simple vector store.
+        chroma_collection_name (str): Collection the "chroma" store is built into.
 
     Returns:
         StorageContext: A storage context configured with the chosen vector store.
     """
     if vector_store == "faiss":
         logging.info("Vector store choosen: FAISS")
-        # hardcoding embedding dimensionality to config dict
-        d = 3072
-        faiss_index = faiss.IndexFlatIP(d)
-        vector_store = FaissVectorStore(faiss_index=faiss_index)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        # The FAISS index is created with the dimension of the first embedding
+        faiss_store = FilterableFaissVectorStore()
+        storage_context = StorageContext.from_defaults(vector_store=faiss_store)
 
     elif vector_store == "chroma":
         logging.info("Vector store choosen: CHROMA")
-        chroma_client = chromadb.PersistentClient(path=CHROMA_PERSISTENT_CLIENT_PATH)
-        chroma_collection = chroma_client.create_collection(CHROMA_COLLECTION_NAME)
-        # set up ChromaVectorStore
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
+        chroma_client = get_chroma_client()
+        chroma_collection = recreate_chroma_collection(
+            chroma_client, chroma_collection_name
+        )
+        # set up ChromaVectorStore with batched upserts
+        chroma_store = BulkChromaVectorStore(
+            chroma_collection=chroma_collection, chroma_client=chroma_client
+        )
+        storage_context = StorageContext.from_defaults(vector_store=chroma_store)
+
+    elif vector_store == "numpy":
+        logging.info("Vector store choosen: NUMPY")
+        numpy_store = NumpyVectorStore(dtype=NUMPY_VECTOR_STORE_DTYPE)
+        storage_context = StorageContext.from_defaults(vector_store=numpy_store)
 
     else:
         logging.info("Vector store choosen: SIMPLE")
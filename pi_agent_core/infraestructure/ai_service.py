@@ -1,5 +1,6 @@
 import os
 import logging
+from typing import Optional
 
 from llama_index.llms.azure_openai import AzureOpenAI
 from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
@@ -8,15 +9,30 @@ from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.llms.cohere import Cohere
 from llama_index.embeddings.cohere import CohereEmbedding
 from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
 
 from dotenv import load_dotenv
 
 from pi_agent_core.helpers.utils import load_config_file
-from config.config import PI_AGENT_CONFIG
+from pi_agent_core.infraestructure.cached_embedding import CachedEmbedding
+from pi_agent_core.infraestructure.shared_cache import get_embedding_cache
+from pi_agent_core.infraestructure.projected_embedding import (
+    supports_native_dimensions,
+)
+from config.config import (
+    PI_AGENT_CONFIG,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_DIMENSIONS,
+)
 
 load_dotenv(override=True)
 
 
+def _native_dimensions(model_name: str) -> Optional[int]:
+    """Returns the dimension to request from the model API, if it supports one."""
+    return EMBEDDING_DIMENSIONS if supports_native_dimensions(model_name) else None
+
+
 def set_service_context() -> None:
     """Configures the global Settings object with the appropriate language model (LLM)
     and embedding model based on the specified provider in the environment variables.
@@ -29,7 +45,9 @@ def set_service_context() -> None:
         1. Loads service context configuration from a configuration file.
         2. Reads the `LLM_PROVIDER` environment variable to determine the model provider.
         3. Initializes the appropriate LLM and embedding model for the provider.
-        4. Updates the global `Settings` object with the configured models.
+        4. Requests EMBEDDING_DIMENSIONS from the embedding models supporting it natively.
+        5. Wraps the embedding model with the shared embedding cache, if enabled.
+        6. Updates the global `Settings` object with the configured models.
 
     Environment Variables:
         - LLM_PROVIDER: Specifies the provider to use (e.g., "COHERE", "AZURE", or "OPENAI").
@@ -42,7 +60,7 @@ def set_service_context() -> None:
     agent_params = load_config_file(PI_AGENT_CONFIG)["service_context"]
 
     llm = None
-    embed_model = None
+    embed_model: BaseEmbedding
 
     # Fetch the LLM provider from environment variables
     llm_provider = os.getenv("LLM_PROVIDER")
@@ -61,6 +79,9 @@ def set_service_context() -> None:
         embed_model = OpenAIEmbedding(
             api_key=os.getenv("OPENAI_API_KEY"),
             model=agent_params["embedding"]["open_ai"]["model"],
+            dimensions=_native_dimensions(
+                agent_params["embedding"]["open_ai"]["model"]
+            ),
         )
 
     # Configure models for Azure OpenAI
@@ -79,6 +100,9 @@ def set_service_context() -> None:
             api_version=os.getenv("AZURE_API_VERSION"),
             azure_deployment=os.getenv("AZURE_EMBEDDING_MODEL_DEPLOYMENT"),
             model=agent_params["embedding"]["azure_open_ai"]["model"],
+            dimensions=_native_dimensions(
+                agent_params["embedding"]["azure_open_ai"]["model"]
+            ),
         )
 
     # Defaults to Cohere models if no matching provider is found
@@ -93,6 +117,12 @@ def set_service_context() -> None:
             model_name=agent_params["embedding"]["cohere"]["model"],
         )
 
+    # Share computed embeddings between the API workers
+    if EMBEDDING_CACHE_ENABLED:
+        embed_model = CachedEmbedding(
+            embed_model=embed_model, cache=get_embedding_cache()
+        )
+
     # Update the Settings object with the configured LLM and embedding models
     Settings.llm = llm
     Settings.embed_model = embed_model
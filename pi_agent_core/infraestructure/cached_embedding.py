@@ -0,0 +1,111 @@
+from typing import Any, List, Optional
+
+import numpy as np
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr, SerializeAsAny
+
+from pi_agent_core.infraestructure.shared_cache import SharedCache
+
+
+class CachedEmbedding(BaseEmbedding):
+    """An embedding model that caches the embeddings of the wrapped model.
+
+    Embeddings are stored as float32 bytes in a SharedCache, keyed by model,
+    requested dimension, input type (query or text) and input, so every worker
+    of the node reuses the embeddings computed by the others.
+    """
+
+    embed_model: SerializeAsAny[BaseEmbedding]
+
+    _cache: SharedCache = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, cache: SharedCache, **kwargs: Any):
+        super().__init__(
+            embed_model=embed_model,
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _key(self, kind: str, text: str) -> str:
+        # Models returning reduced embeddings natively are cached per dimension
+        dimensions = getattr(self.embed_model, "dimensions", None)
+        return SharedCache.make_key(
+            self.embed_model.class_name(),
+            self.model_name,
+            *([str(dimensions)] if dimensions else []),
+            kind,
+            text,
+        )
+
+    def _get_cached(self, kind: str, text: str) -> Optional[Embedding]:
+        value = self._cache.get(self._key(kind, text))
+        return None if value is None else np.frombuffer(value, np.float32).tolist()
+
+    def _set_cached(self, kind: str, text: str, embedding: Embedding) -> None:
+        value = np.asarray(embedding, dtype=np.float32).tobytes()
+        self._cache.set(self._key(kind, text), value)
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        embedding = self._get_cached("query", query)
+        if embedding is None:
+            embedding = self.embed_model._get_query_embedding(query)
+            self._set_cached("query", query, embedding)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        embedding = self._get_cached("query", query)
+        if embedding is None:
+            embedding = await self.embed_model._aget_query_embedding(query)
+            self._set_cached("query", query, embedding)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _split_cached_texts(
+        self, texts: List[str]
+    ) -> tuple[List[Optional[Embedding]], List[int]]:
+        """Looks up every text, returning the embeddings and the positions of the misses."""
+        embeddings = [self._get_cached("text", text) for text in texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        return embeddings, missing
+
+    def _fill_missing(
+        self,
+        texts: List[str],
+        embeddings: List[Optional[Embedding]],
+        missing: List[int],
+        computed: List[Embedding],
+    ) -> List[Embedding]:
+        filled = dict(zip(missing, computed))
+        for i, embedding in filled.items():
+            self._set_cached("text", texts[i], embedding)
+        return [
+            filled[i] if embedding is None else embedding
+            for i, embedding in enumerate(embeddings)
+        ]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        embeddings, missing = self._split_cached_texts(texts)
+        computed = (
+            self.embed_model._get_text_embeddings([texts[i] for i in missing])
+            if missing
+            else []
+        )
+        return self._fill_missing(texts, embeddings, missing, computed)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        embeddings, missing = self._split_cached_texts(texts)
+        computed = (
+            await self.embed_model._aget_text_embeddings([texts[i] for i in missing])
+            if missing
+            else []
+        )
+        return self._fill_missing(texts, embeddings, missing, computed)
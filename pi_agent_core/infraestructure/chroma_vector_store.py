@@ -0,0 +1,234 @@
+import logging
+from typing import Any, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+import chromadb
+from chromadb.api import ClientAPI
+from chromadb.api.models.Collection import Collection
+from chromadb.api.types import Metadata
+from chromadb.errors import InvalidCollectionException, NotFoundError
+
+from config.config import (
+    CHROMA_COLLECTION_NAME,
+    CHROMA_PERSISTENT_CLIENT_PATH,
+    CHROMA_SERVER_HOST,
+    CHROMA_SERVER_PORT,
+    CHROMA_HNSW_SPACE,
+    CHROMA_HNSW_M,
+    CHROMA_HNSW_CONSTRUCTION_EF,
+    CHROMA_HNSW_SEARCH_EF,
+    CHROMA_HNSW_BATCH_SIZE,
+    CHROMA_HNSW_SYNC_THRESHOLD,
+    CHROMA_UPSERT_BATCH_SIZE,
+)
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+from llama_index.vector_stores.chroma import ChromaVectorStore
+from llama_index.vector_stores.chroma.base import chunk_list
+
+
+def get_chroma_client() -> ClientAPI:
+    """Creates the ChromaDB client configured for the service.
+
+    If CHROMA_SERVER_HOST is set, the client connects to a running Chroma server,
+    so several API workers share one collection. Otherwise the on-disk store in
+    CHROMA_PERSISTENT_CLIENT_PATH is opened in-process.
+
+    Returns:
+        ClientAPI: The ChromaDB client.
+    """
+    if CHROMA_SERVER_HOST:
+        logging.info(
+            f"Chroma client: server at {CHROMA_SERVER_HOST}:{CHROMA_SERVER_PORT}"
+        )
+        return chromadb.HttpClient(host=CHROMA_SERVER_HOST, port=CHROMA_SERVER_PORT)
+
+    logging.info(f"Chroma client: persistent store at {CHROMA_PERSISTENT_CLIENT_PATH}")
+    return chromadb.PersistentClient(path=CHROMA_PERSISTENT_CLIENT_PATH)
+
+
+def get_chroma_collection_metadata() -> dict:
+    """Builds the collection metadata holding the HNSW parameters.
+
+    Chroma only reads these values when the collection is created, so they take
+    effect on the next index build.
+
+    Returns:
+        dict: The collection metadata.
+    """
+    return {
+        "hnsw:space": CHROMA_HNSW_SPACE,
+        "hnsw:M": CHROMA_HNSW_M,
+        "hnsw:construction_ef": CHROMA_HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": CHROMA_HNSW_SEARCH_EF,
+        "hnsw:batch_size": CHROMA_HNSW_BATCH_SIZE,
+        "hnsw:sync_threshold": CHROMA_HNSW_SYNC_THRESHOLD,
+    }
+
+
+# Raised for a missing collection: ValueError by the local client of older
+# chromadb versions, the chromadb errors by the HTTP client and newer versions
+COLLECTION_NOT_FOUND_ERRORS = (ValueError, InvalidCollectionException, NotFoundError)
+
+
+def chroma_collection_name(index_version: str) -> str:
+    """Name of the collection holding an index build.
+
+    Every build gets its own collection, so the API workers keep querying the
+    previous one until they reload the index.
+
+    Args:
+        index_version (str): Version of the index build.
+
+    Returns:
+        str: The collection name.
+    """
+    return f"{CHROMA_COLLECTION_NAME}-{index_version}"
+
+
+def delete_chroma_collection(client: ClientAPI, name: str) -> None:
+    """Deletes a collection, doing nothing if it does not exist.
+
+    Args:
+        client (ClientAPI): The ChromaDB client.
+        name (str): The collection name.
+    """
+    try:
+        client.delete_collection(name)
+    except COLLECTION_NOT_FOUND_ERRORS:
+        pass
+
+
+def recreate_chroma_collection(client: ClientAPI, name: str) -> Collection:
+    """Drops the collection if it exists and creates it again with the configured HNSW parameters.
+
+    Args:
+        client (ClientAPI): The ChromaDB client.
+        name (str): The collection name.
+
+    Returns:
+        Collection: The new, empty collection.
+    """
+    delete_chroma_collection(client, name)
+
+    return client.create_collection(name, metadata=get_chroma_collection_metadata())
+
+
+def delete_stale_chroma_collections(client: ClientAPI, keep: Iterable[str]) -> None:
+    """Deletes the collections of the index builds no worker can still be serving.
+
+    Args:
+        client (ClientAPI): The ChromaDB client.
+        keep (Iterable[str]): Collections to keep: the current build, and the
+                              previous one that workers serve until they reload.
+    """
+    keep = set(keep)
+    for collection in client.list_collections():
+        # list_collections returns names in recent chromadb versions
+        name = collection if isinstance(collection, str) else collection.name
+        is_index_build = name == CHROMA_COLLECTION_NAME or name.startswith(
+            f"{CHROMA_COLLECTION_NAME}-"
+        )
+        if is_index_build and name not in keep:
+            logging.info(f"Deleting stale Chroma collection '{name}'")
+            delete_chroma_collection(client, name)
+
+
+def warm_up_chroma_collection(collection: Collection) -> None:
+    """Runs one query against the collection so the HNSW segment is loaded
+    before the first user request instead of during it.
+
+    Args:
+        collection (Collection): The collection to warm up.
+    """
+    sample = collection.peek(limit=1)
+    embeddings = sample["embeddings"]
+    if embeddings is None or len(embeddings) == 0:
+        logging.warning(f"Chroma collection '{collection.name}' is empty")
+        return
+
+    collection.query(query_embeddings=np.asarray(embeddings[:1]), n_results=1)
+    logging.info(
+        f"Chroma collection '{collection.name}' warmed up ({collection.count()} vectors)"
+    )
+
+
+class BulkChromaVectorStore(ChromaVectorStore):
+    """A ChromaVectorStore that writes nodes with large batched upserts.
+
+    Upserting makes re-running an index build idempotent, and the batch size is
+    capped to the largest batch the Chroma client accepts.
+    """
+
+    upsert_batch_size: int = CHROMA_UPSERT_BATCH_SIZE
+
+    _chroma_client: ClientAPI = PrivateAttr()
+
+    def __init__(
+        self,
+        chroma_collection: Collection,
+        chroma_client: ClientAPI,
+        upsert_batch_size: Optional[int] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Initializes the store.
+
+        Args:
+            chroma_collection (Collection): The collection to write to.
+            chroma_client (ClientAPI): The client the collection was opened with.
+            upsert_batch_size (Optional[int]): Max number of nodes per upsert.
+                                               Defaults to CHROMA_UPSERT_BATCH_SIZE.
+        """
+        super().__init__(chroma_collection=chroma_collection, **kwargs)
+        if upsert_batch_size is not None:
+            self.upsert_batch_size = upsert_batch_size
+        self._chroma_client = chroma_client
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BulkChromaVectorStore"
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Upserts nodes into the collection.
+
+        Args:
+            nodes (Sequence[BaseNode]): Nodes carrying their embedding.
+
+        Returns:
+            List[str]: The ids of the upserted nodes.
+        """
+        batch_size = min(
+            self.upsert_batch_size, self._chroma_client.get_max_batch_size()
+        )
+
+        all_ids = []
+        for node_chunk in chunk_list(list(nodes), batch_size):
+            embeddings = []
+            metadatas: List[Metadata] = []
+            ids = []
+            documents = []
+            for node in node_chunk:
+                embeddings.append(node.get_embedding())
+                metadata_dict = node_to_metadata_dict(
+                    node, remove_text=True, flat_metadata=self.flat_metadata
+                )
+                # Chroma rejects None metadata values
+                for key in metadata_dict:
+                    if metadata_dict[key] is None:
+                        metadata_dict[key] = ""
+                metadatas.append(metadata_dict)
+                ids.append(node.node_id)
+                documents.append(node.get_content(metadata_mode=MetadataMode.NONE))
+
+            self._collection.upsert(
+                embeddings=np.asarray(embeddings, dtype=np.float32),
+                ids=ids,
+                metadatas=metadatas,
+                documents=documents,
+            )
+            all_ids.extend(ids)
+
+        return all_ids
@@ -0,0 +1,238 @@
+import os
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional
+
+from config.config import (
+    CONVERSATION_STORE,
+    CONVERSATION_STORE_TTL_SECONDS,
+    CONVERSATION_STORE_MAX_BYTES,
+    PATH_CONVERSATION_STORE_SQLITE_FILE,
+)
+from pi_agent_core.models import ConversationMemory, ConversationStoreStats
+from pi_agent_core.infraestructure.shared_cache import LocalSQLiteConnection
+
+
+class ConversationConflictError(Exception):
+    """Raised when a turn can't be saved because its session keeps changing."""
+
+
+class BaseConversationStore(ABC):
+    """Server-side storage of the conversation memory of each chat session.
+
+    Saves are compare-and-set on the version of the memory: a memory read
+    before another request of the session saved its own is not saved, so
+    concurrent requests can't overwrite each other's turns.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[ConversationMemory]:
+        """Returns the memory of a session, or None if it is unknown or expired."""
+
+    @abstractmethod
+    def save(self, session_id: str, memory: ConversationMemory) -> bool:
+        """Stores the memory of a session, refreshing its TTL.
+
+        Args:
+            session_id (str): The session.
+            memory (ConversationMemory): The memory, as read from the store and
+                                         updated. A new session has version 0.
+
+        Returns:
+            bool: False if the session was saved since the memory was read, in
+                  which case nothing is stored.
+        """
+
+    @abstractmethod
+    def stats(self) -> ConversationStoreStats:
+        """Returns the number of sessions and bytes held by the store."""
+
+
+class InMemoryConversationStore(BaseConversationStore):
+    """Process-local conversation store with a TTL and a total memory cap.
+
+    Conversations are kept serialized, so the cap is enforced on their exact
+    size. When the cap is exceeded the least recently used sessions are evicted.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # session_id -> (last access time, version, serialized memory), in LRU order
+        self._conversations: OrderedDict[str, tuple[float, int, bytes]] = OrderedDict()
+        self._size = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, session_id: str) -> None:
+        _, _, data = self._conversations.pop(session_id)
+        self._size -= len(data)
+
+    def _purge_expired(self, now: float) -> None:
+        # Entries are in access order, so expired ones are at the front
+        while self._conversations:
+            session_id, (accessed_at, _, _) = next(iter(self._conversations.items()))
+            if now - accessed_at < self.ttl_seconds:
+                break
+            self._remove(session_id)
+            self._expirations += 1
+
+    def get(self, session_id: str) -> Optional[ConversationMemory]:
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            if session_id not in self._conversations:
+                return None
+            _, version, data = self._conversations[session_id]
+            self._conversations[session_id] = (now, version, data)
+            self._conversations.move_to_end(session_id)
+
+        memory = ConversationMemory.model_validate_json(data)
+        memory.version = version
+        return memory
+
+    def save(self, session_id: str, memory: ConversationMemory) -> bool:
+        data = memory.model_dump_json().encode("utf-8")
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            if session_id in self._conversations:
+                if self._conversations[session_id][1] != memory.version:
+                    return False
+                self._remove(session_id)
+            self._conversations[session_id] = (now, memory.version + 1, data)
+            self._size += len(data)
+            self._purge_expired(now)
+            # Evict least recently used sessions, never the one just saved
+            while self._size > self.max_bytes and len(self._conversations) > 1:
+                self._remove(next(iter(self._conversations)))
+                self._evictions += 1
+
+        memory.version += 1
+        return True
+
+    def stats(self) -> ConversationStoreStats:
+        with self._lock:
+            self._purge_expired(time.time())
+            return ConversationStoreStats(
+                backend="memory",
+                sessions=len(self._conversations),
+                bytes=self._size,
+                max_bytes=self.max_bytes,
+                evictions=self._evictions,
+                expirations=self._expirations,
+            )
+
+
+class SQLiteConversationStore(BaseConversationStore):
+    """Conversation store persisted in a local SQLite file.
+
+    The database runs in WAL mode, so it can be shared by several API workers
+    on the same node. Expired sessions are deleted when a session is saved.
+    Connections are a LocalSQLiteConnection, like the ones of the SharedCache.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._connection = LocalSQLiteConnection(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = self._connection.get()
+        with connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL, "
+                "version INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = [
+                row[1] for row in connection.execute("PRAGMA table_info(conversations)")
+            ]
+            if "version" not in columns:
+                # Tables created before saves were versioned
+                connection.execute(
+                    "ALTER TABLE conversations "
+                    "ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+                )
+
+    def get(self, session_id: str) -> Optional[ConversationMemory]:
+        row = (
+            self._connection.get()
+            .execute(
+                "SELECT data, version FROM conversations "
+                "WHERE session_id = ? AND updated_at >= ?",
+                (session_id, time.time() - self.ttl_seconds),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        memory = ConversationMemory.model_validate_json(row[0])
+        memory.version = row[1]
+        return memory
+
+    def save(self, session_id: str, memory: ConversationMemory) -> bool:
+        now = time.time()
+        connection = self._connection.get()
+        with connection:
+            # Take the write lock before reading the version, so the check and
+            # the write are atomic across workers
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT version FROM conversations "
+                "WHERE session_id = ? AND updated_at >= ?",
+                (session_id, now - self.ttl_seconds),
+            ).fetchone()
+            if row is not None and row[0] != memory.version:
+                return False
+
+            connection.execute(
+                "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?)",
+                (session_id, memory.model_dump_json(), now, memory.version + 1),
+            )
+            connection.execute(
+                "DELETE FROM conversations WHERE updated_at < ?",
+                (now - self.ttl_seconds,),
+            )
+
+        memory.version += 1
+        return True
+
+    def stats(self) -> ConversationStoreStats:
+        sessions, size = (
+            self._connection.get()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM conversations "
+                "WHERE updated_at >= ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            .fetchone()
+        )
+
+        return ConversationStoreStats(backend="sqlite", sessions=sessions, bytes=size)
+
+
+@lru_cache(maxsize=None)
+def get_conversation_store() -> BaseConversationStore:
+    """Creates, once per process, the conversation store selected in CONVERSATION_STORE.
+
+    Returns:
+        BaseConversationStore: The "memory" store by default, or the "sqlite" store.
+    """
+    logging.info(f"Conversation store choosen: {CONVERSATION_STORE.upper()}")
+    if CONVERSATION_STORE == "sqlite":
+        return SQLiteConversationStore(
+            path=PATH_CONVERSATION_STORE_SQLITE_FILE,
+            ttl_seconds=CONVERSATION_STORE_TTL_SECONDS,
+        )
+
+    return InMemoryConversationStore(
+        ttl_seconds=CONVERSATION_STORE_TTL_SECONDS,
+        max_bytes=CONVERSATION_STORE_MAX_BYTES,
+    )
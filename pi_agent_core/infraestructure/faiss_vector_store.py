@@ -0,0 +1,153 @@
+import os
+import json
+from typing import Any, List, Optional, Sequence
+
+import faiss
+import fsspec
+import numpy as np
+from fsspec.implementations.local import LocalFileSystem
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.vector_stores.faiss import FaissVectorStore
+from llama_index.vector_stores.faiss.base import DEFAULT_PERSIST_PATH
+
+from pi_agent_core.infraestructure.metadata_groups import MetadataGroups
+
+
+def _metadata_path(persist_path: str) -> str:
+    """Path of the metadata file persisted next to the FAISS index."""
+    return f"{os.path.splitext(persist_path)[0]}.metadata.json"
+
+
+class FilterableFaissVectorStore(FaissVectorStore):
+    """A FaissVectorStore supporting metadata filters.
+
+    FAISS only stores vectors, so the scalar metadata of every row is kept
+    aside, once per distinct value, and persisted next to the index. Filters
+    select the allowed rows first, and the search only scores those rows.
+    """
+
+    _group_ids: Optional[List[int]] = PrivateAttr(default=None)
+    _metadata_groups: MetadataGroups = PrivateAttr(default_factory=MetadataGroups)
+
+    def __init__(self, faiss_index: Optional[Any] = None, **kwargs: Any) -> None:
+        """Initializes the store.
+
+        Args:
+            faiss_index (Optional[Any]): The FAISS index. Defaults to an inner
+                                         product index created on the first add,
+                                         with the dimension of the embeddings.
+        """
+        super().__init__(faiss_index=faiss_index, **kwargs)
+        # Rows added before the store kept metadata can't be filtered
+        self._group_ids = [] if faiss_index is None or faiss_index.ntotal == 0 else None
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Adds embedded nodes to the index, recording their metadata.
+
+        Args:
+            nodes (Sequence[BaseNode]): Nodes carrying their embedding.
+
+        Returns:
+            List[str]: The FAISS row ids of the added nodes.
+        """
+        if self._faiss_index is None and nodes:
+            self._faiss_index = faiss.IndexFlatIP(len(nodes[0].get_embedding()))
+        ids = super().add(list(nodes), **add_kwargs)
+        if self._group_ids is not None:
+            self._group_ids.extend(self._metadata_groups.group_ids(nodes).tolist())
+        return ids
+
+    def persist(
+        self,
+        persist_path: str = DEFAULT_PERSIST_PATH,
+        fs: Optional[fsspec.AbstractFileSystem] = None,
+    ) -> None:
+        """Persists the FAISS index and, next to it, the metadata of its rows.
+
+        Args:
+            persist_path (str): Path of the FAISS index file.
+            fs (Optional[fsspec.AbstractFileSystem]): Only local storage is supported.
+        """
+        if self._faiss_index is None:
+            # Created on the first add, with the dimension of the embeddings
+            raise ValueError("Cannot persist an empty FAISS index, no node was added")
+        super().persist(persist_path, fs=fs)
+        if self._group_ids is None:
+            return
+
+        with open(_metadata_path(persist_path), "w") as f:
+            json.dump(
+                {"groups": self._metadata_groups.groups, "group_ids": self._group_ids},
+                f,
+            )
+
+    @classmethod
+    def from_persist_path(
+        cls, persist_path: str, fs: Optional[fsspec.AbstractFileSystem] = None
+    ) -> "FilterableFaissVectorStore":
+        """Loads the FAISS index and the metadata of its rows, if persisted.
+
+        Args:
+            persist_path (str): Path of the FAISS index file.
+            fs (Optional[fsspec.AbstractFileSystem]): Only local storage is supported.
+
+        Returns:
+            FilterableFaissVectorStore: The loaded store.
+        """
+        if fs and not isinstance(fs, LocalFileSystem):
+            raise NotImplementedError("FAISS only supports local storage for now.")
+        if not os.path.exists(persist_path):
+            raise ValueError(f"No existing FAISS index found at {persist_path}.")
+
+        store = cls(faiss_index=faiss.read_index(persist_path))
+        metadata_path = _metadata_path(persist_path)
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            store._metadata_groups = MetadataGroups(metadata["groups"])
+            store._group_ids = metadata["group_ids"]
+
+        return store
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Returns the rows closest to the query among those matching its filters.
+
+        Args:
+            query (VectorStoreQuery): The query holding the embedding, top k and filters.
+
+        Returns:
+            VectorStoreQueryResult: The matching row ids sorted by decreasing similarity.
+        """
+        if query.filters is None:
+            return super().query(query, **kwargs)
+
+        if self._group_ids is None:
+            raise ValueError(
+                "Cannot filter a FAISS index persisted without metadata. "
+                "Rebuild the index to enable filtering."
+            )
+        mask = self._metadata_groups.mask(
+            np.asarray(self._group_ids, dtype=np.int32), query.filters
+        )
+        rows = np.flatnonzero(mask).astype(np.int64)
+        if len(rows) == 0:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        query_embedding = np.array(query.query_embedding, dtype=np.float32)[None, :]
+        # The SWIG constructor takes the fields as keywords, the stubs don't say so
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(rows))  # type: ignore[call-arg]
+        distances, indices = self._faiss_index.search(
+            query_embedding, min(query.similarity_top_k, len(rows)), params=params
+        )
+
+        found = indices[0] >= 0
+        return VectorStoreQueryResult(
+            similarities=distances[0][found].tolist(),
+            ids=[str(row) for row in indices[0][found]],
+        )
@@ -1,50 +1,125 @@
-import chromadb
+import logging
+from typing import Optional
+
+from config.config import (
+    CHROMA_COLLECTION_NAME,
+    INDEX_SNAPSHOT_VERIFY_ON_LOAD,
+    NUMPY_VECTOR_STORE_RESCORE,
+    NUMPY_VECTOR_STORE_RESCORE_FACTOR,
+)
+from pi_agent_core.infraestructure.numpy_vector_store import NumpyVectorStore
+from pi_agent_core.infraestructure.faiss_vector_store import FilterableFaissVectorStore
+from pi_agent_core.infraestructure.chroma_vector_store import (
+    get_chroma_client,
+    warm_up_chroma_collection,
+)
+from pi_agent_core.infraestructure.index_snapshot import (
+    read_snapshot_manifest,
+    verify_index_snapshot,
+    check_snapshot_embed_model,
+    load_snapshot_arrays,
+    load_snapshot_blob,
+    load_snapshot_projection,
+)
+from pi_agent_core.infraestructure.projected_embedding import (
+    EmbeddingProjection,
+    ProjectedEmbedding,
+)
 
-from config.config import CHROMA_PERSISTENT_CLIENT_PATH, CHROMA_COLLECTION_NAME
-
-from llama_index.vector_stores.faiss import FaissVectorStore
 from llama_index.core import StorageContext, load_index_from_storage
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.indices.base import BaseIndex
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.storage.index_store import SimpleIndexStore
 
 
 # Agregar Singleton
 class IndexManagment:
     """Manages the creation, loading, and maintenance of vector-based indexes.
-    Supports multiple vector stores, including Simple, Faiss, and ChromaDB,
-    for flexible integration with different storage backends.
+    Supports multiple vector stores, including Simple, Faiss, ChromaDB, Numpy and
+    single-file snapshots, for flexible integration with different storage backends.
     """
 
     def __init__(self):
         self.global_indexes = None
-
-    def load_index(self, index_path: str, vector_store: str = "faiss") -> BaseIndex:
+        # Model embedding the queries, projected like the index if it was reduced
+        self.embed_model = None
+        # Version label of the loaded snapshot
+        self.snapshot_version: Optional[str] = None
+
+    def load_index(
+        self,
+        index_path: str,
+        vector_store: str = "faiss",
+        chroma_collection_name: str = CHROMA_COLLECTION_NAME,
+    ) -> BaseIndex:
         """Loads an index from a specified storage backend into memory.
         If the index is already loaded, it returns the existing global index.
 
         Args:
-            index_path (str): The directory path where the index is persisted.
+            index_path (str): The directory path where the index is persisted, or
+                              the snapshot file path for the "snapshot" store.
             vector_store (str): The type of vector store to use. Options include:
                 - "simple": Default simple index storage.
                 - "faiss": Faiss-based index for fast similarity search.
                 - "chroma": ChromaDB for persistent vector storage.
+                - "numpy": Memory-mapped, optionally quantized NumPy matrix.
+                - "snapshot": Prebuilt single-file snapshot of a "numpy" index.
+            chroma_collection_name (str): The collection opened by the "chroma" store.
         Returns:
             BaseIndex: The loaded index object.
         """
         if self.global_indexes is None:
+            if vector_store != "snapshot":
+                # Chroma keeps its projection with the other index files too
+                self.embed_model = self._get_query_embed_model(
+                    EmbeddingProjection.load_from_dir(index_path)
+                )
             match vector_store:
                 case "simple":
                     global_base_index = self._build_index_simple(index_path=index_path)
                 case "faiss":
                     global_base_index = self._build_index_faiss(index_path=index_path)
                 case "chroma":
-                    global_base_index = self._build_index_chroma()
+                    global_base_index = self._build_index_chroma(
+                        collection_name=chroma_collection_name
+                    )
+                case "numpy":
+                    global_base_index = self._build_index_numpy(index_path=index_path)
+                case "snapshot":
+                    global_base_index = self._build_index_snapshot(
+                        snapshot_path=index_path
+                    )
 
             self.global_indexes = global_base_index
 
             return self.global_indexes
 
+    def _get_query_embed_model(
+        self, projection: Optional[EmbeddingProjection]
+    ) -> BaseEmbedding:
+        """Returns the model embedding the queries in the space of the index.
+
+        Args:
+            projection (Optional[EmbeddingProjection]): The projection fit when
+                                                        the index was built, if any.
+
+        Returns:
+            BaseEmbedding: The configured embedding model, projected if needed.
+        """
+        if projection is None:
+            return Settings.embed_model
+
+        logging.info(
+            f"Projecting query embeddings from {projection.input_dim} "
+            f"to {projection.output_dim} dimensions"
+        )
+        return ProjectedEmbedding(
+            embed_model=Settings.embed_model, projection=projection
+        )
+
     def _build_index_simple(self, index_path: str) -> BaseIndex:
         """Build a simple index using the default llama-index storage context.
 
@@ -56,7 +131,9 @@ class IndexManagment:
         """
         storage_context = StorageContext.from_defaults(persist_dir=index_path)
 
-        index = load_index_from_storage(storage_context=storage_context)
+        index = load_index_from_storage(
+            storage_context=storage_context, embed_model=self.embed_model
+        )
 
         return index
 
@@ -69,28 +146,107 @@ class IndexManagment:
         Returns:
             BaseIndex: The loaded index.
         """
-        vector_store = FaissVectorStore.from_persist_dir(index_path)
+        vector_store = FilterableFaissVectorStore.from_persist_dir(index_path)
         storage_context = StorageContext.from_defaults(
             persist_dir=index_path, vector_store=vector_store
         )
 
-        index = load_index_from_storage(storage_context=storage_context)
+        index = load_index_from_storage(
+            storage_context=storage_context, embed_model=self.embed_model
+        )
 
         return index
 
-    def _build_index_chroma(self) -> BaseIndex:
+    def _build_index_chroma(self, collection_name: str) -> BaseIndex:
         """Build an index using ChromaDB as the vector store.
+        The collection is opened, and queried once to warm up its HNSW index.
+
+        Args:
+            collection_name (str): The collection, each build writes its own.
 
         Returns:
             BaseIndex: The loaded index.
         """
-
-        chroma_client = chromadb.PersistentClient(path=CHROMA_PERSISTENT_CLIENT_PATH)
-        chroma_collection = chroma_client.get_collection(CHROMA_COLLECTION_NAME)
+        chroma_client = get_chroma_client()
+        chroma_collection = chroma_client.get_collection(collection_name)
+        warm_up_chroma_collection(chroma_collection)
         vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
 
         index = VectorStoreIndex.from_vector_store(
-            vector_store=vector_store, embed_model=Settings.embed_model
+            vector_store=vector_store, embed_model=self.embed_model
+        )
+
+        return index
+
+    def _build_index_numpy(self, index_path: str) -> BaseIndex:
+        """Build an index using the memory-mapped NumpyVectorStore.
+
+        Args:
+            index_path (str): The directory path where the index is persisted.
+
+        Returns:
+            BaseIndex: The loaded index.
+        """
+        vector_store = NumpyVectorStore.from_persist_dir(
+            index_path,
+            rescore=NUMPY_VECTOR_STORE_RESCORE,
+            rescore_factor=NUMPY_VECTOR_STORE_RESCORE_FACTOR,
+        )
+        storage_context = StorageContext.from_defaults(
+            persist_dir=index_path, vector_store=vector_store
+        )
+
+        index = load_index_from_storage(
+            storage_context=storage_context, embed_model=self.embed_model
+        )
+
+        return index
+
+    def _build_index_snapshot(self, snapshot_path: str) -> BaseIndex:
+        """Build an index from a single-file snapshot, memory-mapping its vectors.
+
+        Only the manifest is read and checked, unless INDEX_SNAPSHOT_VERIFY_ON_LOAD
+        is set. A snapshot embedded with another model than the configured one is
+        refused.
+
+        Args:
+            snapshot_path (str): The path of the snapshot file.
+
+        Returns:
+            BaseIndex: The loaded index.
+        """
+        if INDEX_SNAPSHOT_VERIFY_ON_LOAD:
+            manifest = verify_index_snapshot(snapshot_path)
+        else:
+            manifest = read_snapshot_manifest(snapshot_path)
+        check_snapshot_embed_model(manifest, Settings.embed_model)
+        logging.info(
+            f"Loading index snapshot {manifest['version']} "
+            f"({manifest['embed_model']['model_name']}, dim {manifest['dim']})"
+        )
+
+        self.snapshot_version = manifest["version"]
+        arrays = load_snapshot_arrays(snapshot_path, manifest)
+        self.embed_model = self._get_query_embed_model(load_snapshot_projection(arrays))
+        vector_store = NumpyVectorStore.from_arrays(
+            arrays,
+            dtype=manifest["dtype"],
+            metadata_groups=manifest.get("metadata_groups"),
+            rescore=NUMPY_VECTOR_STORE_RESCORE,
+            rescore_factor=NUMPY_VECTOR_STORE_RESCORE_FACTOR,
+        )
+        storage_context = StorageContext.from_defaults(
+            docstore=SimpleDocumentStore.from_dict(
+                load_snapshot_blob(snapshot_path, manifest, "docstore")
+            ),
+            index_store=SimpleIndexStore.from_dict(
+                load_snapshot_blob(snapshot_path, manifest, "index_store")
+            ),
+            vector_store=vector_store,
+        )
+
+        index = load_index_from_storage(
+            storage_context=storage_context, embed_model=self.embed_model
         )
 
         return index
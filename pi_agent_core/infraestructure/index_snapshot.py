@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import struct
+import hashlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.indices.base import BaseIndex
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.storage.index_store import SimpleIndexStore
+
+from pi_agent_core.infraestructure.cached_embedding import CachedEmbedding
+from pi_agent_core.infraestructure.numpy_vector_store import (
+    RANDOM_ACCESS_ARRAYS,
+    NumpyVectorStore,
+    map_array,
+)
+from pi_agent_core.infraestructure.projected_embedding import EmbeddingProjection
+
+# Snapshot layout:
+#   header  MAGIC + format version, padded to ALIGNMENT
+#   sections, each starting at a multiple of ALIGNMENT
+#   manifest JSON with the offsets, shapes and sha256 of the sections
+#   footer  manifest offset, manifest length, manifest sha256, MAGIC
+MAGIC = b"PIINDEX\x00"
+FORMAT_VERSION = 1
+# Page aligned sections can be memory-mapped in place
+ALIGNMENT = 4096
+FOOTER = struct.Struct("<QQ32s8s")
+HEADER = struct.Struct("<8sI")
+CHUNK_SIZE = 16 * 2**20
+
+
+class SnapshotError(Exception):
+    """Raised when an index snapshot is corrupted or doesn't fit the service."""
+
+
+def describe_embed_model(embed_model: BaseEmbedding) -> Dict[str, Any]:
+    """Identifies an embedding model by class and model name.
+
+    Args:
+        embed_model (BaseEmbedding): The embedding model, possibly cached.
+
+    Returns:
+        Dict[str, Any]: The class, model name and requested dimension of the
+                        underlying model.
+    """
+    if isinstance(embed_model, CachedEmbedding):
+        embed_model = embed_model.embed_model
+    return {
+        "class_name": embed_model.class_name(),
+        "model_name": embed_model.model_name,
+        "dimensions": getattr(embed_model, "dimensions", None),
+    }
+
+
+def _pad(f: Any) -> int:
+    """Pads the file up to the next multiple of ALIGNMENT and returns the offset."""
+    offset = f.tell()
+    padding = -offset % ALIGNMENT
+    f.write(b"\x00" * padding)
+    return offset + padding
+
+
+def _write_section(f: Any, data: bytes | np.ndarray) -> Dict[str, Any]:
+    offset = _pad(f)
+    buffer = np.ascontiguousarray(data).data.cast("B")
+    digest = hashlib.sha256()
+    for start in range(0, len(buffer), CHUNK_SIZE):
+        chunk = buffer[start : start + CHUNK_SIZE]
+        digest.update(chunk)
+        f.write(chunk)
+    return {"offset": offset, "length": len(buffer), "sha256": digest.hexdigest()}
+
+
+def write_index_snapshot(
+    index: BaseIndex,
+    snapshot_path: str,
+    embed_model: BaseEmbedding,
+    version: Optional[str] = None,
+    projection: Optional[EmbeddingProjection] = None,
+) -> Dict[str, Any]:
+    """Exports an index backed by a NumpyVectorStore as a single snapshot file.
+
+    The file is written next to its destination and renamed at the end, so a
+    running service keeps reading the previous snapshot until it restarts.
+
+    Args:
+        index (BaseIndex): The index to export.
+        snapshot_path (str): Path of the snapshot file.
+        embed_model (BaseEmbedding): The model that embedded the index.
+        version (Optional[str]): Version label of the snapshot. Defaults to the
+                                 UTC build time.
+        projection (Optional[EmbeddingProjection]): The projection applied to the
+                                                    embeddings, if any.
+
+    Returns:
+        Dict[str, Any]: The snapshot manifest.
+    """
+    vector_store = index.storage_context.vector_store
+    if not isinstance(vector_store, NumpyVectorStore):
+        raise SnapshotError(
+            "Only indexes backed by a NumpyVectorStore can be exported as a snapshot"
+        )
+    docstore = index.storage_context.docstore
+    index_store = index.storage_context.index_store
+    if not isinstance(docstore, SimpleDocumentStore) or not isinstance(
+        index_store, SimpleIndexStore
+    ):
+        raise SnapshotError(
+            "Only indexes with in-memory docstore and index store can be exported "
+            "as a snapshot"
+        )
+
+    manifest: Dict[str, Any] = {
+        "format_version": FORMAT_VERSION,
+        "version": version or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()),
+        "created_at": time.time(),
+        "embed_model": describe_embed_model(embed_model),
+        "dim": vector_store.dim,
+        "dtype": vector_store.dtype,
+        "metadata_groups": vector_store.metadata_groups,
+        "arrays": {},
+        "blobs": {},
+    }
+    blobs = {
+        "docstore": docstore.to_dict(),
+        "index_store": index_store.to_dict(),
+    }
+
+    arrays = vector_store.to_arrays()
+    if projection is not None:
+        arrays["projection_mean"] = projection.mean
+        arrays["projection_components"] = projection.components
+
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    tmp_path = f"{snapshot_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        for name, array in arrays.items():
+            array = np.asarray(array)
+            section = _write_section(f, array)
+            section.update(dtype=array.dtype.str, shape=list(array.shape))
+            manifest["arrays"][name] = section
+        for name, blob in blobs.items():
+            manifest["blobs"][name] = _write_section(f, json.dumps(blob).encode())
+
+        manifest_offset = _pad(f)
+        manifest_bytes = json.dumps(manifest).encode()
+        f.write(manifest_bytes)
+        f.write(
+            FOOTER.pack(
+                manifest_offset,
+                len(manifest_bytes),
+                hashlib.sha256(manifest_bytes).digest(),
+                MAGIC,
+            )
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, snapshot_path)
+
+    return manifest
+
+
+def read_snapshot_manifest(snapshot_path: str) -> Dict[str, Any]:
+    """Reads and checks the header, footer and manifest of a snapshot.
+
+    Args:
+        snapshot_path (str): Path of the snapshot file.
+
+    Returns:
+        Dict[str, Any]: The snapshot manifest.
+    """
+    with open(snapshot_path, "rb") as f:
+        magic, format_version = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise SnapshotError(f"{snapshot_path} is not an index snapshot")
+        if format_version != FORMAT_VERSION:
+            raise SnapshotError(
+                f"Unsupported snapshot format version {format_version}, "
+                f"expected {FORMAT_VERSION}"
+            )
+
+        f.seek(-FOOTER.size, os.SEEK_END)
+        manifest_offset, manifest_length, manifest_sha256, magic = FOOTER.unpack(
+            f.read(FOOTER.size)
+        )
+        if magic != MAGIC:
+            raise SnapshotError(f"{snapshot_path} is truncated")
+        f.seek(manifest_offset)
+        manifest_bytes = f.read(manifest_length)
+
+    if hashlib.sha256(manifest_bytes).digest() != manifest_sha256:
+        raise SnapshotError(f"The manifest of {snapshot_path} is corrupted")
+
+    return json.loads(manifest_bytes)
+
+
+def verify_index_snapshot(snapshot_path: str) -> Dict[str, Any]:
+    """Checks the sha256 of every section of a snapshot.
+
+    Reads the whole file, so it is meant for build pipelines rather than startup.
+
+    Args:
+        snapshot_path (str): Path of the snapshot file.
+
+    Returns:
+        Dict[str, Any]: The snapshot manifest.
+    """
+    manifest = read_snapshot_manifest(snapshot_path)
+    sections = {**manifest["arrays"], **manifest["blobs"]}
+    with open(snapshot_path, "rb") as f:
+        for name, section in sections.items():
+            f.seek(section["offset"])
+            digest = hashlib.sha256()
+            remaining = section["length"]
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise SnapshotError(
+                        f"Section '{name}' of {snapshot_path} is truncated"
+                    )
+                digest.update(chunk)
+                remaining -= len(chunk)
+            if digest.hexdigest() != section["sha256"]:
+                raise SnapshotError(f"Section '{name}' of {snapshot_path} is corrupted")
+
+    return manifest
+
+
+def check_snapshot_embed_model(
+    manifest: Dict[str, Any], embed_model: BaseEmbedding
+) -> None:
+    """Refuses a snapshot embedded with another model than the configured one.
+
+    Vectors of different models live in unrelated spaces, so queries would
+    return meaningless results rather than failing.
+
+    Args:
+        manifest (Dict[str, Any]): The snapshot manifest.
+        embed_model (BaseEmbedding): The configured embedding model.
+    """
+    expected = describe_embed_model(embed_model)
+    if {"dimensions": None, **manifest["embed_model"]} != expected:
+        raise SnapshotError(
+            f"Index snapshot {manifest['version']} was embedded with "
+            f"{manifest['embed_model']} but the service is configured with "
+            f"{expected}. Rebuild the snapshot or change the embedding model."
+        )
+
+
+def load_snapshot_arrays(
+    snapshot_path: str, manifest: Dict[str, Any]
+) -> Dict[str, np.ndarray]:
+    """Memory-maps the arrays of a snapshot read-only.
+
+    Args:
+        snapshot_path (str): Path of the snapshot file.
+        manifest (Dict[str, Any]): The snapshot manifest.
+
+    Returns:
+        Dict[str, np.ndarray]: The arrays, by name.
+    """
+    return {
+        name: map_array(
+            snapshot_path,
+            dtype=np.dtype(section["dtype"]),
+            shape=tuple(section["shape"]),
+            offset=section["offset"],
+            random_access=name in RANDOM_ACCESS_ARRAYS,
+        )
+        for name, section in manifest["arrays"].items()
+    }
+
+
+def load_snapshot_projection(
+    arrays: Dict[str, np.ndarray],
+) -> Optional[EmbeddingProjection]:
+    """Returns the embedding projection stored in a snapshot, if any.
+
+    Args:
+        arrays (Dict[str, np.ndarray]): The arrays of the snapshot.
+
+    Returns:
+        Optional[EmbeddingProjection]: The projection to apply to the queries.
+    """
+    if "projection_components" not in arrays:
+        return None
+    return EmbeddingProjection(
+        mean=arrays["projection_mean"], components=arrays["projection_components"]
+    )
+
+
+def load_snapshot_blob(
+    snapshot_path: str, manifest: Dict[str, Any], name: str
+) -> Dict[str, Any]:
+    """Reads a JSON section of a snapshot, such as the docstore.
+
+    Args:
+        snapshot_path (str): Path of the snapshot file.
+        manifest (Dict[str, Any]): The snapshot manifest.
+        name (str): Name of the section.
+
+    Returns:
+        Dict[str, Any]: The decoded section.
+    """
+    section = manifest["blobs"][name]
+    with open(snapshot_path, "rb") as f:
+        f.seek(section["offset"])
+        return json.loads(f.read(section["length"]))
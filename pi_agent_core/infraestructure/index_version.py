@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.config import (
+    PATH_INDEX_VERSION_FILE,
+    PATH_INDEX_BUILD_LOCK_FILE,
+    PATH_LOCAL_STORAGE_INDEX_BUILDS,
+)
+
+# (mtime, size, inode) of the version file and the info read from it
+_cached_info: Tuple[Optional[Tuple[int, int, int]], Optional[Dict[str, Any]]] = (
+    None,
+    None,
+)
+
+
+def new_index_version() -> str:
+    """Returns a unique version label for an index build, sortable by build time."""
+    return f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+
+
+class IndexBuildInProgressError(Exception):
+    """Raised when an index build starts while another one is running."""
+
+
+@contextmanager
+def index_build_lock() -> Iterator[None]:
+    """Holds the lock of the index builds of the node for the whole build.
+
+    The lock is a ``flock`` on PATH_INDEX_BUILD_LOCK_FILE, so it is shared by
+    the API workers and the build scripts, and released if the process dies.
+
+    Raises:
+        IndexBuildInProgressError: If another build holds the lock.
+    """
+    os.makedirs(os.path.dirname(PATH_INDEX_BUILD_LOCK_FILE), exist_ok=True)
+    with open(PATH_INDEX_BUILD_LOCK_FILE, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise IndexBuildInProgressError("Another index build is running")
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def index_build_path(version: str) -> str:
+    """Returns the folder an index build of the given version is persisted in."""
+    return os.path.join(PATH_LOCAL_STORAGE_INDEX_BUILDS, version)
+
+
+def delete_stale_index_builds(keep: List[str]) -> None:
+    """Deletes the folders of the index builds that are not kept.
+
+    Args:
+        keep (List[str]): Paths of the builds to keep, such as the one the
+                          workers serve until they reload.
+    """
+    if not os.path.isdir(PATH_LOCAL_STORAGE_INDEX_BUILDS):
+        return
+    kept = {os.path.abspath(path) for path in keep}
+    for entry in os.scandir(PATH_LOCAL_STORAGE_INDEX_BUILDS):
+        if entry.is_dir() and os.path.abspath(entry.path) not in kept:
+            logging.info(f"Deleting stale index build {entry.name}")
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def write_index_version(version: str, **info: Any) -> None:
+    """Records the index build every API worker of the node must serve.
+
+    Written once the build is complete, so workers never switch to a partial
+    index.
+
+    Args:
+        version (str): Version of the build.
+        **info: Details of the build workers need to load it, such as its
+                folder or the name of the Chroma collection.
+    """
+    os.makedirs(os.path.dirname(PATH_INDEX_VERSION_FILE), exist_ok=True)
+    tmp_path = f"{PATH_INDEX_VERSION_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": version, "created_at": time.time(), **info}, f)
+    os.replace(tmp_path, PATH_INDEX_VERSION_FILE)
+
+
+def read_index_version_info() -> Optional[Dict[str, Any]]:
+    """Returns the info of the current index build, or None if none was recorded.
+
+    The file is only read again when it changes, so checking it on every
+    request costs one ``stat``.
+
+    Returns:
+        Optional[Dict[str, Any]]: The version of the build and its details.
+    """
+    global _cached_info
+    try:
+        stat = os.stat(PATH_INDEX_VERSION_FILE)
+    except FileNotFoundError:
+        return None
+
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    if _cached_info[0] != key:
+        with open(PATH_INDEX_VERSION_FILE) as f:
+            _cached_info = (key, json.load(f))
+    return _cached_info[1]
+
+
+def read_index_version() -> Optional[str]:
+    """Returns the version of the current index build, or None if none was recorded."""
+    info = read_index_version_info()
+    return None if info is None else info["version"]
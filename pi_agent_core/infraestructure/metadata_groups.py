@@ -0,0 +1,144 @@
+import json
+import operator
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
+
+FILTERABLE_TYPES = (str, int, float, bool)
+
+# The operators of the request filters, see models.MetadataFilter
+FILTER_OPERATORS: Dict[FilterOperator, Callable[[Any, Any], bool]] = {
+    FilterOperator.EQ: operator.eq,
+    FilterOperator.NE: operator.ne,
+    FilterOperator.GT: operator.gt,
+    FilterOperator.GTE: operator.ge,
+    FilterOperator.LT: operator.lt,
+    FilterOperator.LTE: operator.le,
+    FilterOperator.IN: lambda value, expected: value in expected,
+    FilterOperator.NIN: lambda value, expected: value not in expected,
+}
+
+
+def filterable_metadata(node: BaseNode) -> Dict[str, Any]:
+    """Returns the scalar metadata of a node, the fields that filters can match.
+
+    Args:
+        node (BaseNode): The node.
+
+    Returns:
+        Dict[str, Any]: The metadata fields holding a str, int, float or bool.
+    """
+    return {
+        key: value
+        for key, value in node.metadata.items()
+        if isinstance(value, FILTERABLE_TYPES)
+    }
+
+
+def _matches_filter(metadata: Dict[str, Any], metadata_filter: MetadataFilter) -> bool:
+    """Returns whether a metadata dict matches one filter.
+
+    Rows missing the key, or holding a value that can't be compared with the
+    filter value, don't match.
+    """
+    if metadata_filter.key not in metadata:
+        return False
+    if metadata_filter.operator not in FILTER_OPERATORS:
+        raise ValueError(f"Unsupported filter operator: {metadata_filter.operator}")
+
+    expected: Any = metadata_filter.value
+    if metadata_filter.operator in (FilterOperator.IN, FilterOperator.NIN):
+        expected = expected if isinstance(expected, list) else [expected]
+    try:
+        return FILTER_OPERATORS[metadata_filter.operator](
+            metadata[metadata_filter.key], expected
+        )
+    except TypeError:
+        return False
+
+
+def matches_filters(metadata: Dict[str, Any], filters: MetadataFilters) -> bool:
+    """Returns whether a metadata dict matches filters, nested ones included.
+
+    Args:
+        metadata (Dict[str, Any]): The metadata of a row.
+        filters (MetadataFilters): The filters, combined with their condition.
+
+    Returns:
+        bool: True if the metadata matches.
+    """
+    results = (
+        matches_filters(metadata, item)
+        if isinstance(item, MetadataFilters)
+        else _matches_filter(metadata, item)
+        for item in filters.filters
+    )
+    if filters.condition == FilterCondition.OR:
+        return any(results)
+    return all(results)
+
+
+class MetadataGroups:
+    """The distinct metadata dicts of the rows of a vector store.
+
+    Chunks of one document page share their metadata, so each distinct dict is
+    stored once and rows point to it through an integer group id. Filters are
+    then evaluated once per group instead of once per row.
+    """
+
+    def __init__(self, groups: Optional[List[Dict[str, Any]]] = None):
+        self.groups = list(groups or [])
+        self._lookup = {
+            self._key(metadata): i for i, metadata in enumerate(self.groups)
+        }
+
+    @staticmethod
+    def _key(metadata: Dict[str, Any]) -> str:
+        return json.dumps(metadata, sort_keys=True)
+
+    def group_ids(self, nodes: Sequence[BaseNode]) -> np.ndarray:
+        """Returns the group id of every node, registering new metadata dicts.
+
+        Args:
+            nodes (Sequence[BaseNode]): The nodes added to the store.
+
+        Returns:
+            np.ndarray: One int32 group id per node.
+        """
+        ids = []
+        for node in nodes:
+            metadata = filterable_metadata(node)
+            key = self._key(metadata)
+            if key not in self._lookup:
+                self._lookup[key] = len(self.groups)
+                self.groups.append(metadata)
+            ids.append(self._lookup[key])
+
+        return np.array(ids, dtype=np.int32)
+
+    def mask(self, group_ids: np.ndarray, filters: MetadataFilters) -> np.ndarray:
+        """Evaluates metadata filters on the rows of a store.
+
+        Args:
+            group_ids (np.ndarray): The group id of every row.
+            filters (MetadataFilters): The filters to apply.
+
+        Returns:
+            np.ndarray: A boolean mask of the rows matching the filters.
+        """
+        allowed = np.fromiter(
+            (matches_filters(metadata, filters) for metadata in self.groups),
+            dtype=np.bool_,
+            count=len(self.groups),
+        )
+        if len(allowed) == 0:
+            return np.zeros(len(group_ids), dtype=np.bool_)
+        return allowed[group_ids]
@@ -0,0 +1,540 @@
+import os
+import json
+import mmap
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.simple import (
+    DEFAULT_PERSIST_FNAME,
+    DEFAULT_VECTOR_STORE,
+    NAMESPACE_SEP,
+)
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+from pi_agent_core.infraestructure.metadata_groups import MetadataGroups
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+# Size of the float32 working copy of the rows scored per matrix product
+BLOCK_BYTES = 4 * 2**20
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Scales every row to unit length so a dot product equals cosine similarity.
+
+    Args:
+        embeddings (np.ndarray): A 2D float32 array of embeddings.
+
+    Returns:
+        np.ndarray: The normalized embeddings.
+    """
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+# Arrays read by scattered rows: re-scoring reads a few full vectors per query,
+# and readahead would page in the whole array
+RANDOM_ACCESS_ARRAYS = frozenset({"full_vectors"})
+
+
+def map_array(
+    path: str,
+    dtype: np.dtype,
+    shape: Tuple[int, ...],
+    offset: int,
+    random_access: bool = False,
+) -> np.ndarray:
+    """Memory-maps an array stored in a file, read-only and without copying.
+
+    Args:
+        path (str): The file holding the array.
+        dtype (np.dtype): Type of the array items.
+        shape (Tuple[int, ...]): Shape of the array.
+        offset (int): Position of the first item in the file.
+        random_access (bool): Disables the kernel readahead on the array, for
+                              arrays read by scattered rows.
+
+    Returns:
+        np.ndarray: The memory-mapped array.
+    """
+    count = int(np.prod(shape))
+    if count == 0:
+        # mmap refuses empty mappings
+        return np.empty(shape, dtype=dtype)
+
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if random_access and hasattr(mmap, "MADV_RANDOM"):
+        # madvise ranges must start on a page boundary
+        start = offset - offset % mmap.PAGESIZE
+        buffer.madvise(mmap.MADV_RANDOM, start, offset - start + count * dtype.itemsize)
+
+    return np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+
+
+def load_npy(path: str, random_access: bool = False) -> np.ndarray:
+    """Memory-maps a .npy file read-only, like ``np.load(path, mmap_mode="r")``.
+
+    Args:
+        path (str): The .npy file.
+        random_access (bool): Disables the kernel readahead on the array.
+
+    Returns:
+        np.ndarray: The memory-mapped array.
+    """
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if fortran_order:
+        raise ValueError(f"{path} holds a Fortran-ordered array")
+
+    return map_array(path, dtype, shape, offset, random_access=random_access)
+
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    """Atomically writes an array in .npy format.
+
+    The array is written to a temporary file first so that a store which is
+    currently memory-mapping ``path`` can be persisted over itself.
+
+    Args:
+        path (str): Destination .npy file.
+        array (np.ndarray): The array to save.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.asarray(array))
+    os.replace(tmp_path, path)
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """A vector store keeping all embeddings in one contiguous NumPy matrix.
+
+    Embeddings are L2-normalized and optionally quantized to float16 or int8
+    (symmetric, one float32 scale per vector). Persisted matrices are opened
+    with ``mmap_mode="r"``, so loading is independent of the index size and
+    only the pages touched by a search are brought into memory.
+
+    The scalar metadata of the nodes is kept once per distinct value, so
+    metadata filters select the candidate rows before any vector is scored.
+
+    Top-k search is a blockwise matrix product followed by ``argpartition``.
+    When the matrix is quantized and ``rescore`` is enabled, the best
+    ``similarity_top_k * rescore_factor`` candidates are re-scored exactly
+    against the float32 copy kept on disk.
+    """
+
+    stores_text: bool = False
+    dtype: str = "int8"
+    rescore: bool = True
+    rescore_factor: int = 4
+
+    _ids: np.ndarray = PrivateAttr()
+    _ref_doc_ids: np.ndarray = PrivateAttr()
+    _vectors: Optional[np.ndarray] = PrivateAttr(default=None)
+    _scales: Optional[np.ndarray] = PrivateAttr(default=None)
+    _full_vectors: Optional[np.ndarray] = PrivateAttr(default=None)
+    _group_ids: Optional[np.ndarray] = PrivateAttr(default=None)
+    _metadata_groups: MetadataGroups = PrivateAttr(default_factory=MetadataGroups)
+    _pending: list = PrivateAttr(default_factory=list)
+
+    def __init__(
+        self,
+        dtype: str = "int8",
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        **kwargs: Any,
+    ) -> None:
+        """Initializes an empty NumpyVectorStore.
+
+        Args:
+            dtype (str): Storage type of the search matrix. One of "float32",
+                         "float16" or "int8".
+            rescore (bool): If True, re-scores quantized candidates with the
+                            exact float32 vectors.
+            rescore_factor (int): Number of candidates retrieved per requested
+                                  result before re-scoring.
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(
+                f"Unsupported dtype '{dtype}'. Options are: {SUPPORTED_DTYPES}"
+            )
+        super().__init__(
+            dtype=dtype, rescore=rescore, rescore_factor=rescore_factor, **kwargs
+        )
+        self._ids = np.array([], dtype=str)
+        self._ref_doc_ids = np.array([], dtype=str)
+        self._group_ids = np.array([], dtype=np.int32)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> None:
+        """There is no underlying client for an in-process store."""
+        return None
+
+    @property
+    def _rescoring(self) -> bool:
+        """Whether exact float32 re-scoring applies to this store."""
+        return (
+            self.rescore and self.dtype != "float32" and self._full_vectors is not None
+        )
+
+    def _quantize(self, embeddings: np.ndarray) -> tuple:
+        """Converts normalized float32 embeddings into the storage dtype.
+
+        Args:
+            embeddings (np.ndarray): Normalized float32 embeddings.
+
+        Returns:
+            tuple: The quantized matrix and the per-vector scales (None unless int8).
+        """
+        if self.dtype == "int8":
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+            return quantized, scales.astype(np.float32)
+
+        return embeddings.astype(self.dtype), None
+
+    def _consolidate(self) -> None:
+        """Appends the embeddings buffered by ``add`` to the search matrix.
+
+        Buffering keeps an index build linear in the number of inserted batches
+        instead of re-copying the whole matrix for each one.
+        """
+        if not self._pending:
+            return
+
+        ids, ref_doc_ids, group_ids, embeddings = zip(*self._pending)
+        self._pending = []
+        full = np.concatenate(embeddings)
+        quantized, scales = self._quantize(full)
+
+        if self._vectors is None:
+            self._vectors = quantized
+            self._scales = scales
+            self._full_vectors = full if self.dtype != "float32" else None
+        else:
+            self._vectors = np.concatenate([self._vectors, quantized])
+            if scales is not None:
+                self._scales = np.concatenate([self._scales, scales])
+            if self._full_vectors is not None:
+                self._full_vectors = np.concatenate([self._full_vectors, full])
+
+        self._ids = np.concatenate([self._ids, *ids])
+        self._ref_doc_ids = np.concatenate([self._ref_doc_ids, *ref_doc_ids])
+        if self._group_ids is not None:
+            self._group_ids = np.concatenate([self._group_ids, *group_ids])
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Adds embedded nodes to the store.
+
+        Args:
+            nodes (Sequence[BaseNode]): Nodes carrying their embedding.
+
+        Returns:
+            List[str]: The ids of the added nodes.
+        """
+        if not nodes:
+            return []
+
+        embeddings = np.asarray(
+            [node.get_embedding() for node in nodes], dtype=np.float32
+        )
+        ids = [node.node_id for node in nodes]
+        ref_doc_ids = [node.ref_doc_id or "" for node in nodes]
+        self._pending.append(
+            (
+                np.array(ids, dtype=str),
+                np.array(ref_doc_ids, dtype=str),
+                self._metadata_groups.group_ids(nodes),
+                normalize(embeddings),
+            )
+        )
+
+        return ids
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Deletes every vector belonging to the given source document.
+
+        Args:
+            ref_doc_id (str): The id of the source document.
+        """
+        self._consolidate()
+        keep = self._ref_doc_ids != ref_doc_id
+        if keep.all() or self._vectors is None:
+            return
+
+        self._ids = self._ids[keep]
+        self._ref_doc_ids = self._ref_doc_ids[keep]
+        if self._group_ids is not None:
+            self._group_ids = np.asarray(self._group_ids[keep])
+        self._vectors = np.asarray(self._vectors[keep])
+        if self._scales is not None:
+            self._scales = np.asarray(self._scales[keep])
+        if self._full_vectors is not None:
+            self._full_vectors = np.asarray(self._full_vectors[keep])
+
+    def _candidate_rows(self, query: VectorStoreQuery) -> Optional[np.ndarray]:
+        """Resolves the node/doc id and metadata restrictions of a query into matrix rows.
+
+        Args:
+            query (VectorStoreQuery): The query to resolve.
+
+        Returns:
+            Optional[np.ndarray]: The allowed row indices, or None if every row is allowed.
+        """
+        mask = None
+        if query.node_ids is not None:
+            mask = np.isin(self._ids, query.node_ids)
+        if query.doc_ids is not None:
+            doc_mask = np.isin(self._ref_doc_ids, query.doc_ids)
+            mask = doc_mask if mask is None else mask & doc_mask
+        if query.filters is not None:
+            if self._group_ids is None:
+                raise ValueError(
+                    "Cannot filter a store persisted without metadata. "
+                    "Rebuild the index to enable filtering."
+                )
+            filter_mask = self._metadata_groups.mask(self._group_ids, query.filters)
+            mask = filter_mask if mask is None else mask & filter_mask
+
+        return None if mask is None else np.flatnonzero(mask)
+
+    def _score(
+        self, query_embedding: np.ndarray, rows: Optional[np.ndarray]
+    ) -> np.ndarray:
+        """Computes the approximate similarity of the query to the candidate rows.
+
+        Args:
+            query_embedding (np.ndarray): The normalized float32 query vector.
+            rows (Optional[np.ndarray]): Row indices to score, or None for all rows.
+
+        Returns:
+            np.ndarray: One float32 score per candidate row.
+        """
+        vectors = self._vectors
+        assert vectors is not None, "the store is empty"
+        n = len(self._ids) if rows is None else len(rows)
+        scores = np.empty(n, dtype=np.float32)
+
+        block_size = max(1, BLOCK_BYTES // (4 * vectors.shape[1]))
+        for start in range(0, n, block_size):
+            end = min(start + block_size, n)
+            block = vectors[start:end] if rows is None else vectors[rows[start:end]]
+            scores[start:end] = np.asarray(block, dtype=np.float32) @ query_embedding
+
+        if self._scales is not None:
+            scores *= self._scales if rows is None else self._scales[rows]
+
+        return scores
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Returns the ids and similarities of the nodes closest to the query.
+
+        Args:
+            query (VectorStoreQuery): The query holding the embedding and top k.
+
+        Returns:
+            VectorStoreQueryResult: The matching ids sorted by decreasing similarity.
+        """
+        self._consolidate()
+        rows = self._candidate_rows(query)
+        n = len(self._ids) if rows is None else len(rows)
+        if self._vectors is None or query.query_embedding is None or n == 0:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        query_embedding = normalize(np.asarray(query.query_embedding, dtype=np.float32))
+        if query_embedding.shape[0] != self._vectors.shape[1]:
+            raise ValueError(
+                f"Query embedding has {query_embedding.shape[0]} dimensions, "
+                f"the store holds {self._vectors.shape[1]}."
+            )
+        full_vectors = self._full_vectors if self._rescoring else None
+        top_k = min(query.similarity_top_k, n)
+        n_candidates = (
+            min(top_k * self.rescore_factor, n) if full_vectors is not None else top_k
+        )
+
+        scores = self._score(query_embedding, rows)
+        if n_candidates < n:
+            candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        else:
+            candidates = np.arange(n)
+        candidate_rows = candidates if rows is None else rows[candidates]
+        candidate_scores = scores[candidates]
+
+        if full_vectors is not None:
+            # Sorted row order turns the memory-mapped gather into forward reads
+            order = np.argsort(candidate_rows)
+            candidate_rows = candidate_rows[order]
+            candidate_scores = (
+                np.asarray(full_vectors[candidate_rows], dtype=np.float32)
+                @ query_embedding
+            )
+
+        best = np.argsort(-candidate_scores)[:top_k]
+
+        return VectorStoreQueryResult(
+            nodes=None,
+            similarities=candidate_scores[best].tolist(),
+            ids=[str(node_id) for node_id in self._ids[candidate_rows[best]]],
+        )
+
+    @property
+    def dim(self) -> Optional[int]:
+        """Dimension of the stored embeddings, None while the store is empty."""
+        self._consolidate()
+        return None if self._vectors is None else int(self._vectors.shape[1])
+
+    @property
+    def metadata_groups(self) -> List[Dict[str, Any]]:
+        """The distinct metadata dicts the ``group_ids`` array points to."""
+        return self._metadata_groups.groups
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Returns the arrays holding the store contents, by name.
+
+        Returns:
+            Dict[str, np.ndarray]: The ids, reference document ids and matrices
+                                   of the store. Missing matrices are left out.
+        """
+        self._consolidate()
+        arrays = {
+            "ids": self._ids,
+            "ref_doc_ids": self._ref_doc_ids,
+            "group_ids": self._group_ids,
+            "vectors": self._vectors,
+            "scales": self._scales,
+            "full_vectors": self._full_vectors,
+        }
+        return {name: array for name, array in arrays.items() if array is not None}
+
+    def persist(self, persist_path: str, fs: Optional[Any] = None) -> None:
+        """Persists the store as a JSON manifest plus memory-mappable .npy files.
+
+        The manifest is written to ``persist_path`` and the arrays next to it,
+        sharing its file name prefix.
+
+        Args:
+            persist_path (str): Path of the manifest file.
+        """
+        os.makedirs(os.path.dirname(persist_path) or ".", exist_ok=True)
+        prefix = os.path.splitext(persist_path)[0]
+
+        files = {}
+        for name, array in self.to_arrays().items():
+            file_name = f"{os.path.basename(prefix)}.{name}.npy"
+            _save_array(os.path.join(os.path.dirname(persist_path), file_name), array)
+            files[name] = file_name
+
+        manifest = {
+            "class_name": self.class_name(),
+            "dtype": self.dtype,
+            "count": len(self._ids),
+            "dim": self.dim,
+            "files": files,
+            "metadata_groups": self.metadata_groups,
+        }
+        with open(persist_path, "w") as f:
+            json.dump(manifest, f)
+
+    @classmethod
+    def from_persist_path(cls, persist_path: str, **kwargs: Any) -> "NumpyVectorStore":
+        """Opens a persisted store, memory-mapping its arrays read-only.
+
+        Args:
+            persist_path (str): Path of the manifest file.
+            **kwargs: Search options such as ``rescore`` and ``rescore_factor``.
+
+        Returns:
+            NumpyVectorStore: The loaded store.
+        """
+        with open(persist_path) as f:
+            manifest = json.load(f)
+
+        directory = os.path.dirname(persist_path)
+        arrays = {
+            name: load_npy(
+                os.path.join(directory, file_name),
+                random_access=name in RANDOM_ACCESS_ARRAYS,
+            )
+            for name, file_name in manifest["files"].items()
+        }
+
+        return cls.from_arrays(
+            arrays,
+            dtype=manifest["dtype"],
+            metadata_groups=manifest.get("metadata_groups"),
+            **kwargs,
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        dtype: str,
+        metadata_groups: Optional[List[Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        """Creates a store over the arrays returned by ``to_arrays``, without copying.
+
+        Args:
+            arrays (Dict[str, np.ndarray]): The store arrays, usually memory-mapped.
+            dtype (str): Storage type of the ``vectors`` array.
+            metadata_groups (Optional[List[Dict[str, Any]]]): The distinct metadata
+                                                              of the rows, as
+                                                              returned by
+                                                              ``metadata_groups``.
+            **kwargs: Search options such as ``rescore`` and ``rescore_factor``.
+
+        Returns:
+            NumpyVectorStore: The store.
+        """
+        store = cls(dtype=dtype, **kwargs)
+        store._ids = arrays.get("ids", store._ids)
+        store._ref_doc_ids = arrays.get("ref_doc_ids", store._ref_doc_ids)
+        # Stores persisted before metadata was kept can't be filtered
+        store._group_ids = arrays.get("group_ids")
+        store._metadata_groups = MetadataGroups(metadata_groups)
+        store._vectors = arrays.get("vectors")
+        store._scales = arrays.get("scales")
+        store._full_vectors = arrays.get("full_vectors")
+
+        return store
+
+    @classmethod
+    def from_persist_dir(
+        cls,
+        persist_dir: str,
+        namespace: str = DEFAULT_VECTOR_STORE,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        """Opens the store persisted by a StorageContext in ``persist_dir``.
+
+        Args:
+            persist_dir (str): The directory the StorageContext was persisted to.
+            namespace (str): The vector store namespace. Defaults to "default".
+
+        Returns:
+            NumpyVectorStore: The loaded store.
+        """
+        persist_path = os.path.join(
+            persist_dir, f"{namespace}{NAMESPACE_SEP}{DEFAULT_PERSIST_FNAME}"
+        )
+        return cls.from_persist_path(persist_path, **kwargs)
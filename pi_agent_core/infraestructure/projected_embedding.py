@@ -0,0 +1,148 @@
+import os
+from typing import Any, List, Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr, SerializeAsAny
+
+from pi_agent_core.infraestructure.numpy_vector_store import normalize
+
+# File holding the projection, saved next to the persisted index
+PROJECTION_FILE_NAME = "embedding_projection.npz"
+# Models whose API returns shorter embeddings natively through `dimensions`
+NATIVE_DIMENSIONS_MODEL_PREFIXES = ("text-embedding-3",)
+
+
+def supports_native_dimensions(model_name: str) -> bool:
+    """Whether the provider can return embeddings of a requested dimension.
+
+    Args:
+        model_name (str): Name of the embedding model.
+
+    Returns:
+        bool: True for the OpenAI text-embedding-3 models.
+    """
+    return model_name.startswith(NATIVE_DIMENSIONS_MODEL_PREFIXES)
+
+
+class EmbeddingProjection:
+    """A PCA projection of embeddings onto their main components.
+
+    Projected embeddings are L2-normalized, so inner product and cosine
+    similarity rank them the same way, as they do for the original embeddings.
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def output_dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(
+        cls, embeddings: ArrayLike, dim: int, max_samples: int, seed: int = 0
+    ) -> "EmbeddingProjection":
+        """Fits the projection on a sample of the embeddings.
+
+        Args:
+            embeddings (ArrayLike): The (n, input_dim) embeddings.
+            dim (int): Requested output dimension.
+            max_samples (int): Max number of embeddings used for the fit.
+            seed (int): Random seed of the sample.
+
+        Returns:
+            EmbeddingProjection: The fitted projection.
+
+        Raises:
+            ValueError: If fewer than ``dim`` components can be fit, because the
+                        sample or the input dimension is smaller than ``dim``.
+        """
+        samples = np.asarray(embeddings, dtype=np.float32)
+        if len(samples) > max_samples:
+            rng = np.random.default_rng(seed)
+            samples = samples[rng.choice(len(samples), max_samples, False)]
+
+        if min(samples.shape) < dim:
+            raise ValueError(
+                f"Cannot fit {dim} components on {len(samples)} embeddings "
+                f"of dimension {samples.shape[1]}"
+            )
+
+        mean = samples.mean(axis=0)
+        # Rows of vt are the principal axes, by decreasing variance
+        _, _, vt = np.linalg.svd(samples - mean, full_matrices=False)
+
+        return cls(mean=mean, components=vt[:dim])
+
+    def transform(self, embeddings: ArrayLike) -> np.ndarray:
+        """Projects (n, input_dim) or (input_dim,) embeddings."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        return normalize((vectors - self.mean) @ self.components.T)
+
+    def save(self, path: str) -> None:
+        np.savez(path, mean=self.mean, components=self.components)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingProjection":
+        with np.load(path) as arrays:
+            return cls(mean=arrays["mean"], components=arrays["components"])
+
+    @classmethod
+    def load_from_dir(cls, persist_dir: str) -> Optional["EmbeddingProjection"]:
+        """Loads the projection saved with an index, if the index has one."""
+        path = os.path.join(persist_dir, PROJECTION_FILE_NAME)
+        return cls.load(path) if os.path.exists(path) else None
+
+
+class ProjectedEmbedding(BaseEmbedding):
+    """An embedding model that projects the embeddings of the wrapped model.
+
+    The index build projects the chunk embeddings with the projection fitted
+    on them, and the queries go through this model to land in the same space.
+    """
+
+    embed_model: SerializeAsAny[BaseEmbedding]
+
+    _projection: EmbeddingProjection = PrivateAttr()
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        projection: EmbeddingProjection,
+        **kwargs: Any,
+    ):
+        super().__init__(
+            embed_model=embed_model,
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            **kwargs,
+        )
+        self._projection = projection
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ProjectedEmbedding"
+
+    def _project(self, embedding: Embedding) -> Embedding:
+        return self._projection.transform(embedding).tolist()
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._project(self.embed_model._get_query_embedding(query))
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._project(await self.embed_model._aget_query_embedding(query))
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._project(self.embed_model._get_text_embedding(text))
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        embeddings = self.embed_model._get_text_embeddings(texts)
+        return self._projection.transform(embeddings).tolist()
@@ -0,0 +1,164 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from config.config import (
+    PATH_SHARED_CACHE_SQLITE_FILE,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+)
+
+
+class LocalSQLiteConnection:
+    """A SQLite connection opened lazily per thread and per process.
+
+    SQLite connections can't be used by several threads, nor across a fork, so
+    an object holding one and created before forking stays usable in workers.
+
+    Args:
+        path (str): The database file.
+        pragmas (Sequence[str]): PRAGMA statements run on each new connection.
+    """
+
+    def __init__(self, path: str, pragmas: Sequence[str] = ()):
+        self.path = path
+        self.pragmas = pragmas
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """Returns the connection of the calling thread and process."""
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.connection = sqlite3.connect(self.path, timeout=10)
+            for pragma in self.pragmas:
+                self._local.connection.execute(f"PRAGMA {pragma}")
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+
+class SharedCache:
+    """A key-value cache stored in a local SQLite file in WAL mode.
+
+    Every API worker of the node opens the same file, so a value cached by one
+    worker is a hit for all of them. Connections are a LocalSQLiteConnection.
+    """
+
+    # Number of writes between two size checks of the cache
+    TRIM_INTERVAL = 100
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.path = path
+        self.table = f"cache_{namespace}"
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._connection = LocalSQLiteConnection(path, pragmas=["synchronous=NORMAL"])
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = self._connection.get()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_created_at "
+            f"ON {self.table} (created_at)"
+        )
+        connection.commit()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Hashes the parts of a cache key into a fixed-size key."""
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the cached value, or None on a miss or an expired entry."""
+        query = f"SELECT value FROM {self.table} WHERE key = ?"
+        params: tuple = (key,)
+        if self.ttl_seconds is not None:
+            query += " AND created_at >= ?"
+            params += (time.time() - self.ttl_seconds,)
+
+        row = self._connection.get().execute(query, params).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return row[0]
+
+    def set(self, key: str, value: bytes) -> None:
+        """Stores a value, trimming the oldest entries now and then."""
+        connection = self._connection.get()
+        with connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+
+        self._writes += 1
+        if self._writes % self.TRIM_INTERVAL == 0:
+            self._trim()
+
+    def _trim(self) -> None:
+        connection = self._connection.get()
+        with connection:
+            if self.ttl_seconds is not None:
+                connection.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,),
+                )
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY created_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        """Deletes every entry of the cache."""
+        connection = self._connection.get()
+        with connection:
+            connection.execute(f"DELETE FROM {self.table}")
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> SharedCache:
+    """Creates, once per process, the cache of the agent responses.
+
+    Returns:
+        SharedCache: The response cache.
+    """
+    return SharedCache(
+        path=PATH_SHARED_CACHE_SQLITE_FILE,
+        namespace="response",
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_embedding_cache() -> SharedCache:
+    """Creates, once per process, the cache of the computed embeddings.
+
+    Returns:
+        SharedCache: The embedding cache.
+    """
+    return SharedCache(
+        path=PATH_SHARED_CACHE_SQLITE_FILE,
+        namespace="embedding",
+        max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Union
+from typing import List, Literal, Optional, Union
 
 
 class CreateIndexResponse(BaseModel):
@@ -17,6 +17,15 @@ class SimpleResponse(BaseModel):
     error: Optional[str] = None
     response: str
     elapsed_time: float
+    session_id: Optional[str] = None
+
+
+class MetadataFilter(BaseModel):
+    """A model defining a condition on the metadata of the knowledge base chunks"""
+
+    key: str = Field(description="Metadata field, e.g. 'file_name' or 'page_label'.")
+    value: Union[int, float, str, List[Union[int, float, str]]]
+    operator: Literal["==", "!=", ">", ">=", "<", "<=", "in", "nin"] = "=="
 
 
 class RequestPrompt(BaseModel):
@@ -24,6 +33,45 @@ class RequestPrompt(BaseModel):
 
     user_name: str = Field(default="John Doe")
     query: str
+    session_id: Optional[str] = Field(
+        default=None,
+        description="Conversation identifier. Requests sharing it keep the chat history.",
+    )
+    filters: Optional[List[MetadataFilter]] = Field(
+        default=None,
+        description="Only chunks matching every filter are searched.",
+    )
+
+
+class RetrieveRequest(BaseModel):
+    """A model structuring retrieval-only requests"""
+
+    query: str
+    similarity_top_k: Optional[int] = Field(default=None, gt=0)
+    filters: Optional[List[MetadataFilter]] = Field(
+        default=None,
+        description="Only chunks matching every filter are searched.",
+    )
+
+
+class RetrievedNode(BaseModel):
+    """A model defining a node returned by the retriever"""
+
+    node_id: str
+    score: Optional[float] = None
+    text: str
+    metadata: dict = Field(default={})
+
+
+class RetrieveResponse(BaseModel):
+    """A model defining the response of a retrieval-only request"""
+
+    status_code: int
+    error: Optional[str] = None
+    nodes: List[RetrievedNode] = Field(default=[])
+    embedding_time: float
+    retrieval_time: float
+    elapsed_time: float
 
 
 class DetectLanguageOutput(BaseModel):
@@ -36,3 +84,65 @@ class TranslateLanguageOutput(BaseModel):
     """A model defining the response for a language translation"""
 
     final_model_output: Union[str, dict[str, str]]
+
+
+class CondenseQuestionOutput(BaseModel):
+    """A model structuring a follow-up question rewritten as a standalone one"""
+
+    standalone_question: str
+
+
+class SummarizeConversationOutput(BaseModel):
+    """A model structuring the summary of the older turns of a conversation"""
+
+    summary: str
+
+
+class ConversationTurn(BaseModel):
+    """A model storing one user message and the agent answer"""
+
+    user: str
+    assistant: str
+
+
+class ConversationMemory(BaseModel):
+    """A model storing the memory of a chat session"""
+
+    summary: str = Field(default="")
+    turns: List[ConversationTurn] = Field(default=[])
+    # Number of saves of the session when it was read, kept by the store
+    version: int = Field(default=0, exclude=True)
+
+
+class ConversationStoreStats(BaseModel):
+    """A model defining the usage statistics of the conversation store"""
+
+    backend: str
+    sessions: int
+    bytes: int
+    max_bytes: Optional[int] = None
+    evictions: int = 0
+    expirations: int = 0
+
+
+class AdmissionStats(BaseModel):
+    """A model defining the load and admission counters of the predict endpoint"""
+
+    in_flight: int
+    queued: int
+    max_in_flight: int
+    max_queue_size: int
+    admitted: int
+    shed_queue_full: int
+    shed_deadline: int
+    avg_wait_time: float
+    max_wait_time: float
+    avg_service_time: float
+
+
+class ProfileCapture(BaseModel):
+    """A model describing a saved request profile"""
+
+    name: str
+    size_bytes: int
+    created_at: float
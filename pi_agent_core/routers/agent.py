@@ -1,24 +1,64 @@
 import os
+import json
 import time
 import logging
+from typing import AsyncGenerator, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from llama_index.core import Settings
 
 from pi_agent_core.index_generation.index_generation_process import (
     create_index_from_knowleadge_base,
 )
-from pi_agent_core.models import CreateIndexResponse, SimpleResponse, RequestPrompt
+from pi_agent_core.models import (
+    CreateIndexResponse,
+    SimpleResponse,
+    RequestPrompt,
+    ConversationStoreStats,
+    AdmissionStats,
+    RetrieveRequest,
+    RetrieveResponse,
+    RetrievedNode,
+    ProfileCapture,
+)
 from pi_agent_core.application.query_engine_creator_service import (
     CreateQueryEngineUseCase,
 )
 from pi_agent_core.application.chat_service import ChatService
+from pi_agent_core.application.retrieval_service import RetrievalService
+from pi_agent_core.infraestructure.conversation_store import (
+    BaseConversationStore,
+    get_conversation_store,
+)
 from pi_agent_core.helpers.utils import (
     detect_language,
     check_and_translate_to_specific_language,
+    build_metadata_filters,
+)
+from pi_agent_core.infraestructure.shared_cache import SharedCache, get_response_cache
+from pi_agent_core.infraestructure.index_snapshot import describe_embed_model
+from pi_agent_core.infraestructure.index_version import IndexBuildInProgressError
+from pi_agent_core.helpers.profiling import (
+    ProfiledRoute,
+    is_admin,
+    list_captures,
+    get_capture_path,
+)
+from pi_agent_core.helpers.admission_control import (
+    AdmissionRejected,
+    get_admission_controller,
+)
+from config.config import (
+    PATH_KNOWLEDGE_BASE,
+    ADMISSION_PRIORITY_CLASSES,
+    ADMISSION_DEFAULT_PRIORITY,
+    RESPONSE_CACHE_ENABLED,
 )
-from config.config import PATH_KNOWLEDGE_BASE
 
-router = APIRouter(prefix="/agent")
+# Requests are profiled on demand from the parsing of their body to the
+# serialization of their response, see ProfiledRoute
+router = APIRouter(prefix="/agent", route_class=ProfiledRoute)
 
 
 def get_create_query_engine_use_case() -> CreateQueryEngineUseCase:
@@ -34,49 +74,158 @@ def get_create_query_engine_use_case() -> CreateQueryEngineUseCase:
     return CreateQueryEngineUseCase.get_instance()
 
 
+def response_cache_key(request: RequestPrompt, engine: CreateQueryEngineUseCase) -> str:
+    """Builds the response cache key of a stateless request.
+
+    Besides the query and its filters, the key holds the index build and the
+    models answering it. A worker still serving the previous index can't hand
+    its answers to the workers that already loaded the new one.
+
+    Args:
+        request (RequestPrompt): The request.
+        engine (CreateQueryEngineUseCase): The query engine use case answering it.
+
+    Returns:
+        str: The cache key.
+    """
+    key_parts = [
+        engine.index_version or "",
+        Settings.llm.metadata.model_name,
+        json.dumps(describe_embed_model(Settings.embed_model), sort_keys=True),
+        request.query.strip(),
+    ]
+    if request.filters:
+        key_parts.append(json.dumps([item.model_dump() for item in request.filters]))
+    return SharedCache.make_key(*key_parts)
+
+
+async def admission_control(
+    x_priority: Optional[str] = Header(default=None),
+    x_request_timeout: Optional[float] = Header(default=None),
+) -> AsyncGenerator[float, None]:
+    """Holds a processing slot of the admission controller for the whole request.
+
+    The request waits in the admission queue without using a worker thread. If it
+    is shed, a 429 or 503 error with a Retry-After header is returned right away.
+
+    Args:
+        x_priority (Optional[str]): Priority class of the request. Defaults to ADMISSION_DEFAULT_PRIORITY.
+        x_request_timeout (Optional[float]): Max seconds the request may wait before starting.
+
+    Yields:
+        float: The seconds the request waited in the queue.
+    """
+    priority = ADMISSION_PRIORITY_CLASSES.get(x_priority or ADMISSION_DEFAULT_PRIORITY)
+    if priority is None:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown priority class: {x_priority}"
+        )
+
+    controller = get_admission_controller()
+    try:
+        wait_time = await controller.acquire(
+            priority=priority, timeout=x_request_timeout
+        )
+    except AdmissionRejected as e:
+        logging.warning(f"Request shed with status {e.status_code}: {str(e)}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    start_time = time.perf_counter()
+    try:
+        yield wait_time
+    finally:
+        controller.release(service_time=time.perf_counter() - start_time)
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Rejects requests without a valid admin token with a 403 error.
+
+    Args:
+        x_admin_token (Optional[str]): Admin token of the request.
+    """
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="A valid X-Admin-Token is required")
+
+
 @router.post("/predict", tags=["pi"])
 def predict(
     request: RequestPrompt,
+    queue_wait_time: float = Depends(admission_control),
     engine: CreateQueryEngineUseCase = Depends(get_create_query_engine_use_case),
+    conversation_store: BaseConversationStore = Depends(get_conversation_store),
 ) -> SimpleResponse:
     """Handles the predict endpoint to process user queries and generate model responses.
 
     This function:
-    1. Initializes a query engine using the provided use case.
-    2. Detects the language of the user's query.
-    3. Generates a response using the chat service.
-    4. Ensures the response is translated into the detected language, if necessary.
-    5. Send the response.
+    1. Looks up the shared response cache if the request has no session_id.
+    2. Initializes a query engine using the provided use case, restricted to the chunks matching the request filters.
+    3. Detects the language of the user's query.
+    4. Generates a response using the chat service, with the session memory if a session_id is given.
+    5. Ensures the response is translated into the detected language, if necessary.
+    6. Send the response.
 
     Args:
         request (RequestPrompt): The incoming request containing the user's query.
+        queue_wait_time (float): Seconds the request waited for admission. Defaults to admission_control().
         engine (CreateQueryEngineUseCase): Dependency-injected query engine use case. Defaults to get_create_query_engine_use_case().
+        conversation_store (BaseConversationStore): Dependency-injected store of the chat sessions. Defaults to get_conversation_store().
 
     Returns:
         SimpleResponse: A structured response containing the status code, response message,
                         elapsed time, and any errors that occurred.
     """
+    logging.info("Request admitted after waiting %.3fs", queue_wait_time)
     try:
         start_time = time.time()
 
-        # Generete query_engine
-        query_engine = engine.execute()
+        # Stateless requests are answered from the shared response cache when possible
+        cache_key = None
+        final_agent_response = None
+        if RESPONSE_CACHE_ENABLED and request.session_id is None:
+            cache_key = response_cache_key(request, engine)
+            cached_response = get_response_cache().get(cache_key)
+            if cached_response is not None:
+                final_agent_response = json.loads(cached_response)
 
-        # Initialize the chat service with the query engine
-        chat_service = ChatService(
-            engine=query_engine,
-        )
+        if final_agent_response is None:
+            # Generete query_engine, searching only the chunks matching the filters
+            query_engine = engine.execute(
+                filters=build_metadata_filters(request.filters)
+            )
+
+            # Initialize the chat service with the query engine
+            chat_service = ChatService(
+                engine=query_engine,
+                conversation_store=conversation_store,
+            )
+
+            # Detect the language of the input query
+            language = detect_language(request.query)
 
-        # Detect the language of the input query
-        language = detect_language(request.query)
+            # Get the agent's response
+            agent_response = chat_service.chat(
+                request.query, session_id=request.session_id
+            )
+            if request.session_id is not None:
+                logging.info(
+                    "Session %s memory time: %.3fs",
+                    request.session_id,
+                    chat_service.memory_elapsed_time,
+                )
 
-        # Get the agent's response
-        agent_response = chat_service.chat(request.query)
+            # Translate the response to the user's language if necessary
+            final_agent_response = check_and_translate_to_specific_language(
+                model_response=agent_response, language=language
+            ).final_model_output
 
-        # Translate the response to the user's language if necessary
-        final_agent_response = check_and_translate_to_specific_language(
-            model_response=agent_response, language=language
-        ).final_model_output
+            if cache_key is not None:
+                get_response_cache().set(
+                    cache_key, json.dumps(final_agent_response).encode("utf-8")
+                )
 
         # Calculate elapsed time for performance tracking
         end_time = time.time()
@@ -88,6 +237,7 @@ def predict(
             error=None,
             response=final_agent_response,
             elapsed_time=elapsed_time,
+            session_id=request.session_id,
         )
 
     except Exception as e:
@@ -106,6 +256,91 @@ def predict(
     return predict_response
 
 
+@router.post("/retrieve", tags=["pi"])
+def retrieve(
+    request: RetrieveRequest,
+    engine: CreateQueryEngineUseCase = Depends(get_create_query_engine_use_case),
+) -> RetrieveResponse:
+    """Handles the retrieve endpoint to return the nodes closest to a query.
+
+    Only the query embedding and the vector search run, the LLM is never called.
+
+    Args:
+        request (RetrieveRequest): The incoming request containing the query and the number of nodes.
+        engine (CreateQueryEngineUseCase): Dependency-injected query engine use case. Defaults to get_create_query_engine_use_case().
+
+    Returns:
+        RetrieveResponse: A structured response containing the nodes with their scores and the timings.
+    """
+    try:
+        start_time = time.time()
+
+        retrieval_service = RetrievalService(
+            index=engine.index,
+            embed_model=engine.embed_model,
+            similarity_top_k=engine.agent_params["query_engine"]["similarity_top_k"],
+        )
+        nodes = retrieval_service.retrieve(
+            request.query,
+            similarity_top_k=request.similarity_top_k,
+            filters=build_metadata_filters(request.filters),
+        )
+
+        retrieve_response = RetrieveResponse(
+            status_code=200,
+            nodes=[
+                RetrievedNode(
+                    node_id=node.node_id,
+                    score=node.score,
+                    text=node.get_content(),
+                    metadata=node.metadata,
+                )
+                for node in nodes
+            ],
+            embedding_time=retrieval_service.embedding_time,
+            retrieval_time=retrieval_service.retrieval_time,
+            elapsed_time=time.time() - start_time,
+        )
+
+    except Exception as e:
+        logging.error(f"An unexpected error ocurred: {str(e)}")
+        retrieve_response = RetrieveResponse(
+            status_code=500,
+            error="An unexpected error ocurred.",
+            embedding_time=-1.0,
+            retrieval_time=-1.0,
+            elapsed_time=-1.0,
+        )
+
+    return retrieve_response
+
+
+@router.get("/conversation_store/stats", tags=["pi"])
+def conversation_store_stats(
+    conversation_store: BaseConversationStore = Depends(get_conversation_store),
+) -> ConversationStoreStats:
+    """Reports how many chat sessions the conversation store holds and their memory use.
+
+    Args:
+        conversation_store (BaseConversationStore): Dependency-injected store of the chat sessions.
+
+    Returns:
+        ConversationStoreStats: The usage statistics of the conversation store.
+    """
+    return conversation_store.stats()
+
+
+@router.get("/admission/stats", tags=["pi"])
+def admission_stats() -> AdmissionStats:
+    """Reports the load of the predict endpoint: requests in flight, queue depth,
+    wait times and shed counts.
+
+    Returns:
+        AdmissionStats: The admission controller statistics.
+    """
+    return get_admission_controller().stats()
+
+
 @router.post("/create_index", tags=["pi"])
 async def create_index() -> CreateIndexResponse:
     """Handles the ingestion endpoint to trigger the creation of an index.
@@ -123,6 +358,9 @@ async def create_index() -> CreateIndexResponse:
 
         # Index generation
         create_index_from_knowleadge_base()
+        # Cached responses were generated from the previous index
+        if RESPONSE_CACHE_ENABLED:
+            get_response_cache().clear()
 
         # Create a success response
         response = CreateIndexResponse(
@@ -131,6 +369,15 @@ async def create_index() -> CreateIndexResponse:
             processed_files=files_to_process,
         )
 
+    # Another worker is building the index
+    except IndexBuildInProgressError as e:
+        logging.warning(f"Index not generated: {str(e)}")
+        response = CreateIndexResponse(
+            status_code=409,
+            message=f"Index not generated: {str(e)}",
+            processed_files=[],
+        )
+
     # Create error response
     except Exception as e:
         logging.error(f"An error occurred during ingestion: {str(e)}")
@@ -141,3 +388,32 @@ async def create_index() -> CreateIndexResponse:
         )
 
     return response
+
+
+@router.get("/profiles", tags=["admin"], dependencies=[Depends(require_admin)])
+def profiles() -> List[ProfileCapture]:
+    """Lists the saved request profiles, newest first.
+
+    Returns:
+        List[ProfileCapture]: The name, size and creation time of every capture.
+    """
+    return list_captures()
+
+
+@router.get(
+    "/profiles/{capture_name}", tags=["admin"], dependencies=[Depends(require_admin)]
+)
+def download_profile(capture_name: str) -> FileResponse:
+    """Downloads a saved profile in the folded stack format.
+
+    Args:
+        capture_name (str): The name of the capture, as listed by /profiles.
+
+    Returns:
+        FileResponse: The capture file.
+    """
+    path = get_capture_path(capture_name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return FileResponse(path, media_type="text/plain", filename=capture_name)
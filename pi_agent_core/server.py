@@ -0,0 +1,178 @@
+"""Multi-worker serving mode.
+
+Loads the index once in a parent process, then forks the API workers so they
+share it read-only: memory-mapped vectors through the page cache, and the other
+backends through copy-on-write pages. The workers accept connections on one
+socket bound by the parent, which restarts them if they die.
+
+Usage:
+    python -m pi_agent_core.server --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import os
+import gc
+import time
+import signal
+import socket
+import logging
+import argparse
+
+import uvicorn
+
+from config.config import (
+    SERVER_WORKERS,
+    VECTOR_STORE,
+    CHROMA_SERVER_HOST,
+    CONVERSATION_STORE,
+)
+from pi_agent_core.app import app
+from pi_agent_core.infraestructure.ai_service import set_service_context
+from pi_agent_core.infraestructure.index_snapshot import SnapshotError
+from pi_agent_core.application.query_engine_creator_service import (
+    CreateQueryEngineUseCase,
+)
+
+# Backends whose loaded index can be shared by forked workers. A Chroma client
+# holds connections and threads that must not cross a fork.
+PRELOADABLE_VECTOR_STORES = ("simple", "faiss", "numpy", "snapshot")
+
+
+def check_worker_config(workers: int) -> None:
+    """Refuses to start several workers with backends they can't share.
+
+    Args:
+        workers (int): Number of worker processes.
+
+    Raises:
+        SystemExit: If the configuration is not safe for several workers.
+    """
+    if workers <= 1:
+        return
+    if CONVERSATION_STORE == "memory":
+        raise SystemExit(
+            "Conversation sessions in memory are not shared by the workers. "
+            "Set CONVERSATION_STORE to 'sqlite' or run a single worker."
+        )
+    if VECTOR_STORE == "chroma" and not CHROMA_SERVER_HOST:
+        raise SystemExit(
+            "The on-disk Chroma store can't be opened by several workers. "
+            "Set CHROMA_SERVER_HOST to share one Chroma server or run a single worker."
+        )
+
+
+def preload_index() -> None:
+    """Loads the index in the parent process so every worker inherits it."""
+    if VECTOR_STORE not in PRELOADABLE_VECTOR_STORES:
+        logging.info(f"Vector store '{VECTOR_STORE}' is loaded by each worker")
+        return
+
+    set_service_context()
+    try:
+        CreateQueryEngineUseCase.get_instance()
+    except SnapshotError:
+        # A corrupted or mismatched snapshot won't get better on retry
+        raise
+    except Exception as e:
+        # Workers retry on their first request, e.g. before /create_index ran
+        logging.warning(f"Index not preloaded: {str(e)}")
+        CreateQueryEngineUseCase._instance = None
+
+
+def run_worker(sock: socket.socket, log_level: str) -> None:
+    """Serves the API on the inherited socket until the worker is stopped."""
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn_worker(sock: socket.socket, log_level: str) -> int:
+    """Forks a worker process and returns its pid."""
+    pid = os.fork()
+    if pid == 0:
+        # Drop the supervisor handlers, uvicorn installs its own
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            run_worker(sock, log_level)
+        except BaseException:
+            logging.exception("Worker crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    logging.info(f"Started worker {pid}")
+    return pid
+
+
+def serve(host: str, port: int, workers: int, log_level: str) -> None:
+    """Checks the configuration, preloads the index, forks the workers and supervises them.
+
+    Args:
+        host (str): Interface to bind.
+        port (int): Port to bind.
+        workers (int): Number of worker processes.
+        log_level (str): Uvicorn log level.
+    """
+    logging.basicConfig(level=logging.INFO)
+    check_worker_config(workers)
+
+    preload_index()
+    # Keep the preloaded objects out of the garbage collector, so collections
+    # in the workers don't write to, and copy, the pages shared with the parent
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    logging.info(f"Serving on http://{host}:{port} with {workers} workers")
+
+    pids = {spawn_worker(sock, log_level) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while pids:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        pids.discard(pid)
+        if not stopping:
+            logging.warning(f"Worker {pid} exited with status {status}, restarting")
+            # Avoid a tight restart loop when workers fail at startup
+            time.sleep(1)
+            pids.add(spawn_worker(sock, log_level))
+
+    sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API with forked workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    serve(
+        host=args.host, port=args.port, workers=args.workers, log_level=args.log_level
+    )
+
+
+if __name__ == "__main__":
+    main()
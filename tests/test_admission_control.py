@@ -0,0 +1,192 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from pi_agent_core.helpers.admission_control import (
+    AdmissionController,
+    AdmissionRejected,
+)
+from pi_agent_core.routers import agent
+
+HIGH, NORMAL, LOW = 0, 1, 2
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+async def settle() -> None:
+    """Lets the queued tasks run until they wait for their slot."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def queue_request(
+    controller: AdmissionController, priority: int, name: str, admitted: list
+) -> asyncio.Task:
+    """Starts a request that records its name once admitted."""
+
+    async def request() -> None:
+        await controller.acquire(priority=priority)
+        admitted.append(name)
+
+    return asyncio.create_task(request())
+
+
+async def test_priority_classes_are_admitted_in_order():
+    controller = AdmissionController(
+        max_in_flight=1, max_queue_size=10, queue_timeout=5
+    )
+    await controller.acquire(priority=NORMAL)
+    admitted: list = []
+    tasks = [
+        queue_request(controller, priority, name, admitted)
+        for priority, name in [
+            (LOW, "low"),
+            (NORMAL, "normal-1"),
+            (HIGH, "high"),
+            (NORMAL, "normal-2"),
+        ]
+    ]
+    await settle()
+    assert controller.stats().queued == 4
+
+    for _ in tasks:
+        controller.release(service_time=0.01)
+        await settle()
+
+    assert admitted == ["high", "normal-1", "normal-2", "low"]
+    await asyncio.gather(*tasks)
+    controller.release(service_time=0.01)
+    stats = controller.stats()
+    assert stats.in_flight == 0 and stats.queued == 0
+
+
+async def test_full_queue_sheds_with_429():
+    controller = AdmissionController(max_in_flight=1, max_queue_size=1, queue_timeout=5)
+    await controller.acquire(priority=NORMAL)
+    queued = queue_request(controller, NORMAL, "queued", [])
+    await settle()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire(priority=NORMAL)
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after >= 1
+    assert controller.stats().shed_queue_full == 1
+    queued.cancel()
+
+
+async def test_full_queue_sheds_the_lowest_priority_request():
+    controller = AdmissionController(max_in_flight=1, max_queue_size=1, queue_timeout=5)
+    await controller.acquire(priority=NORMAL)
+    admitted: list = []
+    low = queue_request(controller, LOW, "low", admitted)
+    await settle()
+
+    high = queue_request(controller, HIGH, "high", admitted)
+    await settle()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await low
+    assert rejected.value.status_code == 429
+    controller.release(service_time=0.01)
+    await high
+    assert admitted == ["high"]
+    assert controller.stats().queued == 0
+
+
+async def test_unreachable_deadline_sheds_with_503():
+    controller = AdmissionController(
+        max_in_flight=1, max_queue_size=10, queue_timeout=5
+    )
+    await controller.acquire(priority=NORMAL)
+    controller.release(service_time=3.0)
+    await controller.acquire(priority=NORMAL)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire(priority=NORMAL, timeout=1.0)
+
+    assert rejected.value.status_code == 503
+    assert rejected.value.retry_after == 3
+    stats = controller.stats()
+    assert stats.shed_deadline == 1 and stats.queued == 0
+
+
+async def test_timeout_while_queued_sheds_with_503():
+    controller = AdmissionController(
+        max_in_flight=1, max_queue_size=10, queue_timeout=0.05
+    )
+    await controller.acquire(priority=NORMAL)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        await controller.acquire(priority=NORMAL)
+
+    assert rejected.value.status_code == 503
+    stats = controller.stats()
+    assert stats.queued == 0 and stats.shed_deadline == 1
+    # The expired request must not be handed the slot
+    controller.release(service_time=0.01)
+    assert controller.stats().in_flight == 0
+
+
+@pytest.fixture
+def controller(monkeypatch) -> AdmissionController:
+    controller = AdmissionController(max_in_flight=1, max_queue_size=1, queue_timeout=5)
+    monkeypatch.setattr(agent, "get_admission_controller", lambda: controller)
+    return controller
+
+
+@pytest.fixture
+def client() -> httpx.AsyncClient:
+    """A client of an app whose endpoints hold an admission slot."""
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok(queue_wait_time: float = Depends(agent.admission_control)) -> dict:
+        return {"queue_wait_time": queue_wait_time}
+
+    @app.get("/fail")
+    async def fail(queue_wait_time: float = Depends(agent.admission_control)) -> dict:
+        raise RuntimeError("Endpoint failed")
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+async def test_slot_is_released_when_the_endpoint_raises(controller, client):
+    async with client:
+        response = await client.get("/fail")
+        assert response.status_code == 500
+        assert controller.stats().in_flight == 0
+
+        response = await client.get("/ok")
+        assert response.status_code == 200
+
+    assert controller.stats().in_flight == 0
+
+
+async def test_shed_request_gets_retry_after_header(controller, client):
+    await controller.acquire(priority=NORMAL)
+    queued = queue_request(controller, NORMAL, "queued", [])
+    await settle()
+
+    async with client:
+        response = await client.get("/ok", headers={"X-Priority": "low"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    queued.cancel()
+
+
+async def test_unknown_priority_class_is_rejected(controller, client):
+    async with client:
+        response = await client.get("/ok", headers={"X-Priority": "urgent"})
+
+    assert response.status_code == 400
+    assert controller.stats().in_flight == 0
@@ -0,0 +1,146 @@
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from pi_agent_core.infraestructure import conversation_store
+from pi_agent_core.infraestructure.conversation_store import (
+    InMemoryConversationStore,
+    SQLiteConversationStore,
+)
+from pi_agent_core.models import ConversationMemory, ConversationTurn
+
+TTL_SECONDS = 60
+
+
+def make_memory(text: str, version: int = 0) -> ConversationMemory:
+    """A memory with a single turn, read at the given version."""
+    return ConversationMemory(
+        turns=[ConversationTurn(user=text, assistant=text)], version=version
+    )
+
+
+@pytest.fixture
+def clock(monkeypatch) -> SimpleNamespace:
+    """Replaces the clock of the stores with one moved by hand."""
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(
+        conversation_store, "time", SimpleNamespace(time=lambda: clock.now)
+    )
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, clock, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteConversationStore(
+            path=str(tmp_path / "conversations.db"), ttl_seconds=TTL_SECONDS
+        )
+    return InMemoryConversationStore(ttl_seconds=TTL_SECONDS, max_bytes=1 << 20)
+
+
+def test_save_increments_the_version(store):
+    memory = make_memory("first")
+
+    assert store.save("session", memory)
+
+    assert memory.version == 1
+    stored = store.get("session")
+    assert stored.version == 1
+    assert stored.turns[0].user == "first"
+
+
+def test_stale_version_save_stores_nothing(store):
+    store.save("session", make_memory("first"))
+    current = store.get("session")
+    assert store.save("session", current)
+
+    # Read before the last save, so it would overwrite its turn
+    stale = make_memory("stale", version=1)
+    assert not store.save("session", stale)
+
+    assert stale.version == 1
+    stored = store.get("session")
+    assert stored.version == 2
+    assert stored.turns[0].user == "first"
+
+
+def test_new_session_saved_concurrently_is_not_overwritten(store):
+    assert store.save("session", make_memory("first"))
+
+    assert not store.save("session", make_memory("second"))
+    assert store.get("session").turns[0].user == "first"
+
+
+def test_expired_sessions_are_dropped(store, clock):
+    store.save("old", make_memory("old"))
+    clock.now += TTL_SECONDS / 2
+    store.save("recent", make_memory("recent"))
+
+    clock.now += TTL_SECONDS / 2 + 1
+
+    assert store.get("old") is None
+    assert store.get("recent") is not None
+    assert store.stats().sessions == 1
+
+
+def test_expired_session_can_be_saved_again(store, clock):
+    store.save("session", make_memory("first"))
+    store.save("session", store.get("session"))
+    clock.now += TTL_SECONDS + 1
+
+    assert store.get("session") is None
+    assert store.save("session", make_memory("again"))
+    assert store.get("session").version == 1
+
+
+def test_eviction_keeps_the_session_just_saved(clock):
+    size = len(make_memory("a").model_dump_json().encode("utf-8"))
+    store = InMemoryConversationStore(ttl_seconds=TTL_SECONDS, max_bytes=2 * size)
+    store.save("a", make_memory("a"))
+    clock.now += 1
+    store.save("b", make_memory("b"))
+    clock.now += 1
+    # Reading "a" makes "b" the least recently used session
+    store.get("a")
+
+    store.save("c", make_memory("c"))
+
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert store.stats().evictions == 1
+
+
+def test_eviction_keeps_a_session_larger_than_the_cap(clock):
+    store = InMemoryConversationStore(ttl_seconds=TTL_SECONDS, max_bytes=10)
+    store.save("a", make_memory("a"))
+
+    assert store.save("large", make_memory("large" * 10))
+
+    assert store.get("a") is None
+    assert store.get("large") is not None
+    stats = store.stats()
+    assert stats.sessions == 1 and stats.evictions == 1
+
+
+def test_sqlite_table_without_version_is_migrated(clock, tmp_path):
+    path = str(tmp_path / "conversations.db")
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(
+            "CREATE TABLE conversations ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "INSERT INTO conversations VALUES (?, ?, ?)",
+            ("session", make_memory("first").model_dump_json(), clock.now),
+        )
+    connection.close()
+
+    store = SQLiteConversationStore(path=path, ttl_seconds=TTL_SECONDS)
+
+    memory = store.get("session")
+    assert memory.version == 0
+    assert memory.turns[0].user == "first"
+    assert store.save("session", memory)
+    assert store.get("session").version == 1
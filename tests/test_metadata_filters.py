@@ -0,0 +1,227 @@
+import numpy as np
+import pytest
+
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+
+from pi_agent_core.infraestructure.faiss_vector_store import FilterableFaissVectorStore
+from pi_agent_core.infraestructure.metadata_groups import (
+    MetadataGroups,
+    matches_filters,
+)
+
+DIM = 16
+TOP_K = 10
+
+METADATA = {"file_name": "report.pdf", "page": 3, "score": 0.5, "status": "final"}
+
+
+def single(key: str, operator: FilterOperator, value) -> MetadataFilters:
+    """Filters made of one filter."""
+    return MetadataFilters(
+        filters=[MetadataFilter(key=key, operator=operator, value=value)]
+    )
+
+
+@pytest.mark.parametrize(
+    "key, operator, value, expected",
+    [
+        ("file_name", FilterOperator.EQ, "report.pdf", True),
+        ("file_name", FilterOperator.EQ, "other.pdf", False),
+        ("score", FilterOperator.EQ, 0.5, True),
+        ("file_name", FilterOperator.NE, "other.pdf", True),
+        ("file_name", FilterOperator.NE, "report.pdf", False),
+        ("page", FilterOperator.GT, 2, True),
+        ("page", FilterOperator.GT, 3, False),
+        ("page", FilterOperator.GTE, 3, True),
+        ("page", FilterOperator.GTE, 4, False),
+        ("page", FilterOperator.LT, 4, True),
+        ("page", FilterOperator.LT, 3, False),
+        ("page", FilterOperator.LTE, 3, True),
+        ("page", FilterOperator.LTE, 2, False),
+        ("score", FilterOperator.GT, 0.25, True),
+        ("page", FilterOperator.IN, [1, 3], True),
+        ("page", FilterOperator.IN, [1, 2], False),
+        ("file_name", FilterOperator.IN, "report.pdf", True),
+        ("page", FilterOperator.NIN, [1, 2], True),
+        ("page", FilterOperator.NIN, [3], False),
+        # Missing keys and values of another type never match
+        ("author", FilterOperator.EQ, "me", False),
+        ("author", FilterOperator.NE, "me", False),
+        ("page", FilterOperator.GT, "2", False),
+        ("file_name", FilterOperator.LT, 1, False),
+    ],
+)
+def test_operator(key, operator, value, expected):
+    assert matches_filters(METADATA, single(key, operator, value)) is expected
+
+
+def test_unsupported_operator_is_refused():
+    with pytest.raises(ValueError, match="Unsupported filter operator"):
+        matches_filters(METADATA, single("file_name", FilterOperator.TEXT_MATCH, "rep"))
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        (
+            MetadataFilters(
+                filters=[
+                    MetadataFilter(key="file_name", value="report.pdf"),
+                    MetadataFilter(key="page", value=4),
+                ]
+            ),
+            False,
+        ),
+        (
+            MetadataFilters(
+                filters=[
+                    MetadataFilter(key="file_name", value="report.pdf"),
+                    MetadataFilter(key="page", value=4),
+                ],
+                condition=FilterCondition.OR,
+            ),
+            True,
+        ),
+        # report.pdf AND (page 4 OR final)
+        (
+            MetadataFilters(
+                filters=[
+                    MetadataFilter(key="file_name", value="report.pdf"),
+                    MetadataFilters(
+                        filters=[
+                            MetadataFilter(key="page", value=4),
+                            MetadataFilter(key="status", value="final"),
+                        ],
+                        condition=FilterCondition.OR,
+                    ),
+                ]
+            ),
+            True,
+        ),
+        # page 4 OR (report.pdf AND draft)
+        (
+            MetadataFilters(
+                filters=[
+                    MetadataFilter(key="page", value=4),
+                    MetadataFilters(
+                        filters=[
+                            MetadataFilter(key="file_name", value="report.pdf"),
+                            MetadataFilter(key="status", value="draft"),
+                        ]
+                    ),
+                ],
+                condition=FilterCondition.OR,
+            ),
+            False,
+        ),
+    ],
+)
+def test_nested_conditions(filters, expected):
+    assert matches_filters(METADATA, filters) is expected
+
+
+def make_nodes(embeddings: np.ndarray) -> list:
+    """One node per embedding, with five files and seven pages."""
+    return [
+        TextNode(
+            id_=f"node-{i}",
+            text=f"text {i}",
+            embedding=embedding.tolist(),
+            metadata={"file_name": f"file-{i % 5}.pdf", "page": i % 7, "tags": ["x"]},
+        )
+        for i, embedding in enumerate(embeddings)
+    ]
+
+
+def test_groups_store_each_metadata_once():
+    groups = MetadataGroups()
+    nodes = make_nodes(np.zeros((70, DIM), dtype=np.float32))
+
+    group_ids = groups.group_ids(nodes)
+
+    # Lists can't be filtered, so they are not kept
+    assert len(groups.groups) == 35
+    assert all("tags" not in metadata for metadata in groups.groups)
+    mask = groups.mask(group_ids, single("page", FilterOperator.EQ, 2))
+    assert mask.tolist() == [i % 7 == 2 for i in range(70)]
+
+
+def test_empty_groups_match_no_row():
+    mask = MetadataGroups().mask(
+        np.zeros(0, dtype=np.int32), single("page", FilterOperator.EQ, 2)
+    )
+
+    assert mask.shape == (0,)
+
+
+@pytest.fixture
+def corpus() -> np.ndarray:
+    vectors = np.random.default_rng(0).standard_normal((300, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        single("file_name", FilterOperator.EQ, "file-1.pdf"),
+        single("page", FilterOperator.IN, [0, 6]),
+        MetadataFilters(
+            filters=[
+                MetadataFilter(key="file_name", value="file-2.pdf"),
+                MetadataFilter(key="page", operator=FilterOperator.GTE, value=3),
+            ],
+            condition=FilterCondition.OR,
+        ),
+        # Matches fewer rows than the top k
+        MetadataFilters(
+            filters=[
+                MetadataFilter(key="file_name", value="file-3.pdf"),
+                MetadataFilter(key="page", value=5),
+            ]
+        ),
+    ],
+)
+def test_filtered_faiss_query_matches_brute_force(filters, corpus, tmp_path):
+    store = FilterableFaissVectorStore()
+    nodes = make_nodes(corpus)
+    store.add(nodes)
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    loaded = FilterableFaissVectorStore.from_persist_path(
+        str(tmp_path / "default__vector_store.json")
+    )
+    query = np.random.default_rng(1).standard_normal(DIM).astype(np.float32)
+
+    result = loaded.query(
+        VectorStoreQuery(
+            query_embedding=query.tolist(), similarity_top_k=TOP_K, filters=filters
+        )
+    )
+
+    allowed = np.array([matches_filters(node.metadata, filters) for node in nodes])
+    rows = np.flatnonzero(allowed)
+    scores = corpus[rows] @ query
+    best = np.argsort(-scores)[:TOP_K]
+    assert result.ids == [str(row) for row in rows[best]]
+    np.testing.assert_allclose(result.similarities, scores[best], rtol=1e-5)
+
+
+def test_faiss_query_without_match_is_empty(corpus):
+    store = FilterableFaissVectorStore()
+    store.add(make_nodes(corpus))
+
+    result = store.query(
+        VectorStoreQuery(
+            query_embedding=corpus[0].tolist(),
+            similarity_top_k=TOP_K,
+            filters=single("file_name", FilterOperator.EQ, "missing.pdf"),
+        )
+    )
+
+    assert result.ids == [] and result.similarities == []
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import (
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+
+from pi_agent_core.infraestructure.numpy_vector_store import NumpyVectorStore
+
+DIM = 32
+TOP_K = 10
+
+
+def make_nodes(embeddings: np.ndarray) -> list:
+    """One node per embedding, two nodes per source document, three metadata values."""
+    return [
+        TextNode(
+            id_=f"node-{i}",
+            text=f"text {i}",
+            embedding=embedding.tolist(),
+            metadata={"file_name": f"file-{i % 3}.pdf", "page": i % 5},
+            relationships={
+                NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"doc-{i // 2}")
+            },
+        )
+        for i, embedding in enumerate(embeddings)
+    ]
+
+
+def exact_search(embeddings: np.ndarray, query: np.ndarray, k: int) -> tuple:
+    """Brute-force float32 cosine search: the ids and scores of the top k rows."""
+    vectors = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = vectors @ (query / np.linalg.norm(query))
+    best = np.argsort(-scores)[:k]
+    return [f"node-{i}" for i in best], scores[best]
+
+
+def build_store(embeddings: np.ndarray, **kwargs) -> NumpyVectorStore:
+    """Adds the nodes in several batches, like an index build does."""
+    store = NumpyVectorStore(**kwargs)
+    nodes = make_nodes(embeddings)
+    for start in range(0, len(nodes), 128):
+        store.add(nodes[start : start + 128])
+    return store
+
+
+@pytest.fixture
+def corpus() -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((500, DIM)).astype(np.float32)
+
+
+@pytest.fixture
+def queries(corpus: np.ndarray) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    return corpus[:20] + 0.3 * rng.standard_normal((20, DIM)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_quantized_recall_matches_exact_search(dtype, corpus, queries):
+    store = build_store(corpus, dtype=dtype, rescore=False)
+
+    recalls = []
+    for query in queries:
+        result = store.query(
+            VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=TOP_K)
+        )
+        expected, _ = exact_search(corpus, query, TOP_K)
+        recalls.append(len(set(result.ids) & set(expected)) / TOP_K)
+
+    assert np.mean(recalls) >= 0.9
+
+
+def test_rescored_scores_match_float32(corpus, queries):
+    store = build_store(corpus, dtype="int8", rescore=True)
+
+    for query in queries:
+        result = store.query(
+            VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=TOP_K)
+        )
+        expected_ids, expected_scores = exact_search(corpus, query, TOP_K)
+        assert result.ids == expected_ids
+        np.testing.assert_allclose(result.similarities, expected_scores, rtol=1e-5)
+
+
+def test_delete_removes_the_document_rows(corpus):
+    store = build_store(corpus, dtype="int8")
+    query = VectorStoreQuery(query_embedding=corpus[0].tolist(), similarity_top_k=3)
+    assert store.query(query).ids[0] == "node-0"
+
+    store.delete("doc-0")
+
+    ids = store.query(query).ids
+    assert "node-0" not in ids and "node-1" not in ids
+    expected, _ = exact_search(corpus[2:], corpus[0], 3)
+    assert ids == [f"node-{int(node_id.split('-')[1]) + 2}" for node_id in expected]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_persist_round_trip(dtype, corpus, queries, tmp_path):
+    store = build_store(corpus, dtype=dtype)
+    store.persist(str(tmp_path / "default__vector_store.json"))
+
+    loaded = NumpyVectorStore.from_persist_dir(str(tmp_path))
+
+    np.testing.assert_array_equal(loaded._ids, store._ids)
+    np.testing.assert_array_equal(loaded._ref_doc_ids, store._ref_doc_ids)
+    assert loaded.metadata_groups == store.metadata_groups
+    for query in queries[:5]:
+        vector_query = VectorStoreQuery(
+            query_embedding=query.tolist(), similarity_top_k=TOP_K
+        )
+        before, after = store.query(vector_query), loaded.query(vector_query)
+        assert after.ids == before.ids
+        np.testing.assert_allclose(after.similarities, before.similarities, rtol=1e-6)
+
+
+def test_persisted_metadata_filters(corpus, tmp_path):
+    store = build_store(corpus, dtype="int8")
+    store.persist(str(tmp_path / "default__vector_store.json"))
+    loaded = NumpyVectorStore.from_persist_dir(str(tmp_path))
+
+    result = loaded.query(
+        VectorStoreQuery(
+            query_embedding=corpus[0].tolist(),
+            similarity_top_k=TOP_K,
+            filters=MetadataFilters(
+                filters=[MetadataFilter(key="file_name", value="file-1.pdf")]
+            ),
+        )
+    )
+
+    assert len(result.ids) == TOP_K
+    assert all(int(node_id.split("-")[1]) % 3 == 1 for node_id in result.ids)
@@ -0,0 +1,74 @@
+import time
+import asyncio
+
+import pytest
+
+from pi_agent_core.helpers import profiling
+from pi_agent_core.helpers.profiling import ProfilingSession
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def profiling_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILING_INTERVAL_SECONDS", 0.001)
+    return tmp_path
+
+
+def busy_profiled_request(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def busy_other_request(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def other_request(started: asyncio.Event) -> None:
+    started.set()
+    busy_other_request(0.1)
+
+
+async def test_other_tasks_of_the_event_loop_are_not_sampled(profiling_dir):
+    started = asyncio.Event()
+    with ProfilingSession("request") as session:
+        other = asyncio.create_task(other_request(started))
+        busy_profiled_request(0.1)
+        # The other request runs on the event loop while this one waits
+        await started.wait()
+        await other
+    session._save_thread.join()
+
+    capture = (profiling_dir / session.capture_name).read_text()
+    assert "busy_profiled_request" in capture
+    assert "busy_other_request" not in capture
+
+
+def test_capture_is_saved_and_pruned_off_the_profiled_thread(
+    monkeypatch, profiling_dir
+):
+    monkeypatch.setattr(profiling, "PROFILING_MAX_CAPTURES", 2)
+    sessions = []
+    for _ in range(3):
+        with ProfilingSession("build") as session:
+            busy_profiled_request(0.02)
+        session._save_thread.join()
+        sessions.append(session)
+        # Captures are ordered by their modification time
+        time.sleep(0.01)
+
+    names = {capture.name for capture in profiling.list_captures()}
+    assert names == {session.capture_name for session in sessions[1:]}
+    assert (
+        "busy_profiled_request"
+        in (profiling_dir / sessions[-1].capture_name).read_text()
+    )